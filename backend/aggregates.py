@@ -0,0 +1,286 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from flask import g
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, User, Expense, ExpenseCount, ExpenseRollup, UserDataVersion
+
+counts_table = ExpenseCount.__table__
+rollups_table = ExpenseRollup.__table__
+versions_table = UserDataVersion.__table__
+
+TRACKED_FIELDS = ('user_id', 'category', 'date', 'amount')
+
+SERIES_BUCKETS = ('day', 'week', 'month')
+
+def init_aggregates():
+    """Keep the expense aggregate tables in step with ORM writes.
+
+    The listener runs inside the flush, so the aggregates are written in the
+    same transaction as the expense rows they describe.
+    """
+    if not event.contains(db.session, 'after_flush', _track_expense_changes):
+        event.listen(db.session, 'after_flush', _track_expense_changes)
+
+def month_start(day):
+    """Return the first day of the month a date falls in."""
+    return day.replace(day=1)
+
+def bucket_start(day, bucket):
+    """Return the first day of the day/week/month bucket a date falls in.
+
+    Weeks start on Monday.
+    """
+    if bucket == 'month':
+        return month_start(day)
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+def next_bucket(start, bucket):
+    """Return the start of the bucket following the one starting at start."""
+    if bucket == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    return start + timedelta(days=1)
+
+def bucket_column(bucket, dialect_name):
+    """Return a SQL expression for the bucket start of Expense.date.
+
+    Returns None when the database has no suitable date function; callers
+    then group by day and fold the days into buckets with bucket_start.
+    """
+    if bucket == 'day':
+        return Expense.date
+    if dialect_name == 'sqlite':
+        modifiers = ('start of month',) if bucket == 'month' else ('weekday 0', '-6 days')
+        return db.func.date(Expense.date, *modifiers, type_=db.Date)
+    if dialect_name == 'postgresql':
+        return db.cast(db.func.date_trunc(bucket, Expense.date), db.Date)
+    return None
+
+def _track_expense_changes(session, flush_context):
+    """Collect aggregate changes from the expenses touched by a flush.
+
+    Every inserted, deleted or modified expense bumps its user's data
+    version, even when no counted field changed (e.g. only the description).
+    So does creating or changing the user, which lets read routing tell
+    whether a replica has caught up with all of a user's writes.
+    """
+    changes = []
+    touched_users = set()
+
+    for obj in session.new:
+        if isinstance(obj, Expense):
+            changes.append((_expense_values(obj), 1))
+        elif isinstance(obj, User):
+            touched_users.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Expense):
+            changes.append((_expense_values(obj, before_flush=True), -1))
+
+    for obj in session.dirty:
+        if isinstance(obj, Expense) and session.is_modified(obj):
+            old_values = _expense_values(obj, before_flush=True)
+            new_values = _expense_values(obj)
+            touched_users.update((old_values[0], new_values[0]))
+            if old_values != new_values:
+                changes.append((old_values, -1))
+                changes.append((new_values, 1))
+        elif isinstance(obj, User) and session.is_modified(obj):
+            touched_users.add(obj.id)
+
+    if changes or touched_users:
+        apply_expense_changes(session.connection(), changes, touched_users)
+
+def _expense_values(expense, before_flush=False):
+    """Return the tracked (user_id, category, date, amount) of an expense.
+
+    With before_flush, values changed in this flush are reported as they
+    were loaded from the database.
+    """
+    state = inspect(expense)
+    values = []
+    for name in TRACKED_FIELDS:
+        value = getattr(expense, name)
+        if before_flush:
+            history = state.attrs[name].history
+            if history.deleted:
+                value = history.deleted[0]
+        values.append(value)
+    user_id, category, expense_date, amount = values
+    return user_id, category, expense_date, Decimal(str(amount))
+
+def apply_expense_changes(connection, changes, touched_users=()):
+    """Apply a list of ((user_id, category, date, amount), sign) changes.
+
+    A sign of 1 adds an expense to the aggregates and -1 removes it. Used by
+    the flush listener and by write paths that bypass the ORM. The data
+    version is bumped for every user with changes and for ``touched_users``,
+    whose expenses or accounts changed in fields the aggregates do not count.
+    """
+    counts = Counter()
+    rollups = defaultdict(lambda: [Decimal('0'), 0])
+
+    for (user_id, category, expense_date, amount), sign in changes:
+        counts[(user_id, category)] += sign
+        rollup = rollups[(user_id, category, month_start(expense_date))]
+        rollup[0] += amount * sign
+        rollup[1] += sign
+
+    apply_count_deltas(connection, counts)
+    apply_rollup_deltas(connection, rollups)
+    bump_data_versions(connection, {user_id for user_id, category in counts} | set(touched_users))
+
+def apply_count_deltas(connection, deltas):
+    """Apply {(user_id, category): delta} changes to the expense counters."""
+    for (user_id, category), delta in deltas.items():
+        if delta:
+            _increment(connection, counts_table, {'user_id': user_id, 'category': category}, {'count': delta})
+
+def apply_rollup_deltas(connection, deltas):
+    """Apply {(user_id, category, month): [total, count]} changes to the rollups."""
+    for (user_id, category, month), (total, count) in deltas.items():
+        if total or count:
+            _increment(connection, rollups_table,
+                       {'user_id': user_id, 'category': category, 'month': month},
+                       {'total': total, 'count': count})
+
+def bump_data_versions(connection, user_ids):
+    """Advance the data version of each user whose expenses changed."""
+    for user_id in user_ids:
+        _increment(connection, versions_table, {'user_id': user_id}, {'version': 1})
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+def _increment(connection, table, key, deltas):
+    """Add deltas to the columns of the row of table with the given key, creating it if missing.
+
+    Uses a single upsert where the dialect has one, so two transactions
+    writing the first row for a key cannot both try to insert it. Elsewhere
+    falls back to an UPDATE followed by an INSERT when no row matched.
+    """
+    insert = UPSERT_INSERTS.get(connection.dialect.name)
+    if insert is not None:
+        statement = insert(table).values(**key, **deltas)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=list(key),
+            set_={name: table.c[name] + statement.excluded[name] for name in deltas}
+        ))
+        return
+
+    result = connection.execute(
+        table.update()
+        .where(*(table.c[name] == value for name, value in key.items()))
+        .values({name: table.c[name] + delta for name, delta in deltas.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**key, **deltas))
+
+def get_data_version(user_id):
+    """Return the current data version of a user, 0 before their first write."""
+    return db.session.query(UserDataVersion.version).filter(
+        UserDataVersion.user_id == user_id
+    ).scalar() or 0
+
+def request_data_version(user_id):
+    """Return a user's data version, looked up at most once per request.
+
+    For read views, where the ETag and the response cache key both need it.
+    """
+    versions = g.setdefault('data_versions', {})
+    if user_id not in versions:
+        versions[user_id] = get_data_version(user_id)
+    return versions[user_id]
+
+def track_expense_inserts(connection, rows):
+    """Update the aggregates for expense rows inserted without the ORM."""
+    apply_expense_changes(connection, [
+        ((row['user_id'], row['category'], row['date'], Decimal(str(row['amount']))), 1)
+        for row in rows
+    ])
+
+def insert_expenses(rows, batch_size):
+    """Insert validated expense rows in executemany batches.
+
+    Runs in the current transaction and updates the maintained aggregates;
+    the caller commits.
+    """
+    connection = db.session.connection()
+    for start in range(0, len(rows), batch_size):
+        connection.execute(Expense.__table__.insert(), rows[start:start + batch_size])
+    track_expense_inserts(connection, rows)
+
+def count_expenses(user_id, category=None):
+    """Return the number of expenses a user has, optionally in one category."""
+    query = db.session.query(db.func.sum(ExpenseCount.count)).filter(ExpenseCount.user_id == user_id)
+    if category:
+        query = query.filter(ExpenseCount.category == category)
+    return query.scalar() or 0
+
+def estimate_expense_count(user_id, category=None, date_from=None, date_to=None):
+    """Return an upper bound on the expenses in a date range.
+
+    Counts every expense in the months the range touches, so the estimate is
+    exact for ranges that start and end on month boundaries.
+    """
+    query = db.session.query(db.func.sum(ExpenseRollup.count)).filter(ExpenseRollup.user_id == user_id)
+    if category:
+        query = query.filter(ExpenseRollup.category == category)
+    if date_from:
+        query = query.filter(ExpenseRollup.month >= month_start(date_from))
+    if date_to:
+        query = query.filter(ExpenseRollup.month <= month_start(date_to))
+    return query.scalar() or 0
+
+def summarize_expenses(user_id):
+    """Return per-category (category, total, count) rows for a user from the rollups."""
+    return db.session.query(
+        ExpenseRollup.category,
+        db.func.sum(ExpenseRollup.total).label('total'),
+        db.func.sum(ExpenseRollup.count).label('count')
+    ).filter(
+        ExpenseRollup.user_id == user_id
+    ).group_by(
+        ExpenseRollup.category
+    ).having(
+        db.func.sum(ExpenseRollup.count) > 0
+    ).all()
+
+def rebuild_expense_stats():
+    """Recompute every maintained aggregate from the expenses table."""
+    connection = db.session.connection()
+    connection.execute(counts_table.delete())
+    connection.execute(
+        counts_table.insert().from_select(
+            ['user_id', 'category', 'count'],
+            db.select(Expense.user_id, Expense.category, db.func.count(Expense.id))
+            .group_by(Expense.user_id, Expense.category)
+        )
+    )
+
+    # Group by day in SQL and fold days into months here, which keeps the
+    # rebuild free of database-specific date functions
+    connection.execute(rollups_table.delete())
+    rollups = defaultdict(lambda: [Decimal('0'), 0])
+    daily = connection.execute(
+        db.select(Expense.user_id, Expense.category, Expense.date,
+                  db.func.sum(Expense.amount), db.func.count(Expense.id))
+        .group_by(Expense.user_id, Expense.category, Expense.date)
+        .execution_options(yield_per=1000)
+    )
+    for user_id, category, expense_date, total, count in daily:
+        rollup = rollups[(user_id, category, month_start(expense_date))]
+        rollup[0] += Decimal(str(total))
+        rollup[1] += count
+    if rollups:
+        connection.execute(rollups_table.insert(), [
+            {'user_id': user_id, 'category': category, 'month': month, 'total': total, 'count': count}
+            for (user_id, category, month), (total, count) in rollups.items()
+        ])
+    db.session.commit()
@@ -1,13 +1,34 @@
+import logging
 import os
+import time
+import click
 from flask import Flask, jsonify
-from flask_cors import CORS
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 from flask_migrate import Migrate
 from config import config
-from models import db, User, Expense
+from models import db, User, Expense, ensure_expense_indexes
 from routes.auth import auth_bp
 from routes.expenses import expenses_bp
+from routes.imports import imports_bp
 from auth import is_token_blacklisted
+from aggregates import init_aggregates, rebuild_expense_stats
+from response_cache import response_cache
+from compression import compression
+from cors import cors
+from metrics import metrics
+from sql_diagnostics import sql_diagnostics
+from profiling import request_profiler
+from identity import identity_cache
+from blocklist import token_blocklist
+from hashing import password_hasher, HashingBusy
+from write_coalescing import write_coalescer
+from read_routing import read_routing, read_replica
+from search import ensure_search_index, rebuild_search_index
+from structured_logging import init_logging
+from db_tuning import init_db_tuning, check_database_settings, database_settings
+from importers import IMPORT_FORMATS, ExpenseImporter, parse_csv, parse_ofx, parse_qif
+
+logger = logging.getLogger(__name__)
 
 def create_app(config_name=None):
     """Create and configure the Flask application."""
@@ -16,59 +37,38 @@ def create_app(config_name=None):
     # Load configuration
     config_name = config_name or os.environ.get('FLASK_ENV', 'development')
     app.config.from_object(config[config_name])
+    init_logging(app)
     
     # Initialize extensions
     db.init_app(app)
+    init_db_tuning(app)
+    read_routing.init_app(app)
     migrate = Migrate(app, db)
+    init_aggregates()
+    response_cache.init_app(app)
+    cors.init_app(app)
+    metrics.init_app(app)
+    sql_diagnostics.init_app(app)
+    request_profiler.init_app(app)
+    compression.init_app(app)
+    metrics.add_collector(compression.collect_metrics)
+    identity_cache.init_app(app)
+    token_blocklist.init_app(app)
+    password_hasher.init_app(app)
+    write_coalescer.init_app(app)
+    if app.config['DATABASE_STARTUP_CHECK']:
+        check_database_settings(app)
     
     # Add before_request handler to log all requests
     @app.before_request
     def log_request_info():
         from flask import request
-        print(f"DEBUG: {request.method} {request.url}")
-        print(f"DEBUG: Origin header: {request.headers.get('Origin')}")
-        print(f"DEBUG: Allowed origins: {allowed_origins}")
-        print(f"DEBUG: CORS Origin Match Check - Request origin: '{request.headers.get('Origin')}'")
-        for origin in allowed_origins:
-            print(f"DEBUG: Checking against configured origin: '{origin}'")
-        print(f"DEBUG: All headers: {dict(request.headers)}")
-    
-    # Initialize CORS - Use proper origins configuration for development
-    # For development, allow specific origins rather than a function
-    allowed_origins = [
-        "http://localhost:3000",  # React dev server
-        "http://127.0.0.1:3000",
-        "https://localhost:3000",
-        "https://127.0.0.1:3000",
-        "https://obscure-space-engine-vq74jjqvqqfxxq7-3000.app.github.dev"  # Removed trailing slash
-    ]
-    
-   
-    print(f"DEBUG: CORS allowed origins: {allowed_origins}")
-    
-    CORS(app,
-         origins=allowed_origins,
-         supports_credentials=True,
-         allow_headers=['Content-Type', 'Authorization'],
-         methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
-    
-    print("DEBUG: CORS initialized successfully")
-    
-    # Add after_request handler to ensure CORS headers on all responses
-    @app.after_request
-    def after_request(response):
-        from flask import request
-        origin = request.headers.get('Origin')
-        print(f"DEBUG: After request - Origin: {origin}, Status: {response.status_code}")
-        if origin in allowed_origins:
-            response.headers['Access-Control-Allow-Origin'] = origin
-            response.headers['Access-Control-Allow-Credentials'] = 'true'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-            print(f"DEBUG: Added CORS headers for origin: {origin}")
-        else:
-            print(f"DEBUG: Origin {origin} not in allowed origins: {allowed_origins}")
-        return response
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('request', extra={
+                'method': request.method,
+                'path': request.full_path,
+                'origin': request.headers.get('Origin')
+            })
     
     # Initialize JWT
     jwt = JWTManager(app)
@@ -85,8 +85,7 @@ def create_app(config_name=None):
     
     @jwt.invalid_token_loader
     def invalid_token_callback(error):
-        print(f"DEBUG: Invalid token error: {error}")
-        print(f"DEBUG: JWT_SECRET_KEY being used: {app.config.get('JWT_SECRET_KEY', 'NOT_SET')}")
+        logger.info('invalid token', extra={'error': error})
         return jsonify({'error': 'Invalid token'}), 401
     
     @jwt.unauthorized_loader
@@ -100,48 +99,39 @@ def create_app(config_name=None):
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(expenses_bp)
+    app.register_blueprint(imports_bp)
     
-    # Error handlers with CORS headers
-    def add_cors_headers(response):
-        from flask import request
-        origin = request.headers.get('Origin')
-        if origin in allowed_origins:
-            response.headers['Access-Control-Allow-Origin'] = origin
-            response.headers['Access-Control-Allow-Credentials'] = 'true'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-        return response
-
+    # Error handlers
     @app.errorhandler(400)
     def bad_request(error):
         response = jsonify({'error': 'Bad request'})
         response.status_code = 400
-        return add_cors_headers(response)
+        return response
     
     @app.errorhandler(401)
     def unauthorized(error):
         response = jsonify({'error': 'Unauthorized'})
         response.status_code = 401
-        return add_cors_headers(response)
+        return response
     
     @app.errorhandler(403)
     def forbidden(error):
         response = jsonify({'error': 'Forbidden'})
         response.status_code = 403
-        return add_cors_headers(response)
+        return response
     
     @app.errorhandler(404)
     def not_found(error):
         response = jsonify({'error': 'Not found'})
         response.status_code = 404
-        return add_cors_headers(response)
+        return response
     
     @app.errorhandler(500)
     def internal_error(error):
         db.session.rollback()
         response = jsonify({'error': 'Internal server error'})
         response.status_code = 500
-        return add_cors_headers(response)
+        return response
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
@@ -151,6 +141,28 @@ def create_app(config_name=None):
             'message': 'Expense Tracker API is running'
         }), 200
     
+    # Operational statistics
+    @app.route('/api/stats', methods=['GET'])
+    @jwt_required()
+    def get_stats():
+        """Get counters from the in-process caches and services."""
+        return jsonify({
+            'response_cache': response_cache.stats(),
+            'compression': compression.stats(),
+            'identity_cache': identity_cache.stats(),
+            'token_blocklist': token_blocklist.stats(),
+            'password_hashing': password_hasher.stats(),
+            'sql_diagnostics': sql_diagnostics.stats(),
+            'write_coalescing': write_coalescer.stats(),
+            'read_routing': read_routing.stats()
+        }), 200
+    
+    # Prometheus metrics for this worker process
+    @app.route('/api/metrics', methods=['GET'])
+    def get_metrics():
+        """Get request latency, status, SQL and compression metrics."""
+        return metrics.response()
+    
     # Root endpoint
     @app.route('/', methods=['GET'])
     def index():
@@ -167,11 +179,12 @@ def create_app(config_name=None):
     # User profile endpoints
     @app.route('/api/user/profile', methods=['GET'])
     @jwt_required()
+    @read_replica
+    @response_cache.cached('profile')
     def get_user_profile():
         """Get user profile information."""
         try:
-            current_user_id = int(get_jwt_identity())
-            user = User.query.get(current_user_id)
+            user = identity_cache.resolve(get_jwt_identity())
             
             if not user:
                 return jsonify({'error': 'User not found'}), 404
@@ -248,9 +261,14 @@ def create_app(config_name=None):
             
             user.updated_at = db.func.now()
             db.session.commit()
+            identity_cache.invalidate(current_user_id)
+            response_cache.invalidate_user(current_user_id, 'profile')
             
             return jsonify({'user': user.to_dict()}), 200
             
+        except HashingBusy:
+            db.session.rollback()
+            return jsonify({'error': 'Too many requests, please retry shortly'}), 503
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': 'Failed to update user profile'}), 500
@@ -262,6 +280,42 @@ def create_app(config_name=None):
         db.create_all()
         print('Database initialized successfully!')
     
+    @app.cli.command()
+    def rebuild_stats():
+        """Rebuild the maintained expense counters, rollups, indexes and search index."""
+        ensure_expense_indexes(db.session.connection())
+        rebuild_expense_stats()
+        if ensure_search_index(db.session.connection()):
+            rebuild_search_index(db.session.connection())
+            db.session.commit()
+        print('Expense statistics rebuilt successfully!')
+    
+    @app.cli.command()
+    def prune_tokens():
+        """Delete revoked tokens that have already expired."""
+        deleted = token_blocklist.prune()
+        print(f'Pruned {deleted} expired revoked tokens.')
+    
+    @app.cli.command()
+    def db_settings():
+        """Show the effective database engine, pool and pragma settings."""
+        for name, value in database_settings(app).items():
+            print(f'{name}: {value}')
+    
+    @app.cli.command()
+    @click.option('--interval', type=float, default=0, help='Keep syncing every this many seconds.')
+    def sync_replica(interval):
+        """Copy the primary SQLite database into the read replica."""
+        if not read_routing.enabled:
+            print('No read replica configured (set DATABASE_REPLICA_URL).')
+            return
+        while True:
+            duration = read_routing.sync()
+            print(f'Replica synced in {duration * 1000:.1f} ms.')
+            if not interval:
+                return
+            time.sleep(interval)
+    
     @app.cli.command()
     def seed_db():
         """Seed the database with sample data."""
@@ -294,6 +348,36 @@ def create_app(config_name=None):
         else:
             print('Demo user already exists!')
     
+    @app.cli.command('import-expenses')
+    @click.argument('username')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'import_format', type=click.Choice(IMPORT_FORMATS), help='Defaults to the file extension.')
+    @click.option('--date-format', default=None, help='strptime format of the statement dates.')
+    def import_expenses(username, path, import_format, date_format):
+        """Import a statement file for a user, reporting progress and throughput."""
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            print(f'User {username} not found!')
+            return
+        
+        import_format = import_format or path.rsplit('.', 1)[-1].lower()
+        with open(path, encoding='utf-8-sig', errors='replace', newline='') as statement:
+            if import_format == 'ofx':
+                records = parse_ofx(statement)
+            elif import_format == 'qif':
+                records = parse_qif(statement, date_format=date_format or '%m/%d/%Y')
+            else:
+                records = parse_csv(statement, date_format=date_format or '%Y-%m-%d')
+            
+            importer = ExpenseImporter(user.id, app.config['EXPENSE_CATEGORIES'], app.config['IMPORT_CHUNK_SIZE'])
+            for report in importer.run(records):
+                print(f"{report['rows_read']} rows read, {report['imported']} imported, "
+                      f"{report['skipped']} skipped, {report['failed']} failed "
+                      f"({report['rows_per_second']} rows/sec)")
+        
+        for error in report['errors']:
+            print(f"Row {error['row']}: {error['error']}")
+    
     return app
 
 if __name__ == '__main__':
@@ -308,4 +392,5 @@ if __name__ == '__main__':
     print(f"🌐 In GitHub Codespaces, make sure port {port} is set to 'Public' visibility")
     print(f"📍 Backend should be accessible at: https://{os.environ.get('CODESPACE_NAME', 'localhost')}-{port}.app.github.dev")
     
+    print("🔧 Development server only; use `python run.py serve` in production")
     app.run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
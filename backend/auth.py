@@ -1,15 +1,16 @@
+from datetime import datetime
 from functools import wraps
 from flask import jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from models import User
+from identity import identity_cache
+from blocklist import token_blocklist
 
 def auth_required(f):
     """Decorator to require authentication for routes."""
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = identity_cache.resolve(get_jwt_identity())
         
         if not current_user:
             return jsonify({'error': 'User not found'}), 401
@@ -19,27 +20,20 @@ def auth_required(f):
     return decorated_function
 
 def get_current_user():
-    """Get the current authenticated user."""
-    current_user_id = get_jwt_identity()
-    if current_user_id:
-        return User.query.get(current_user_id)
-    return None
+    """Get the current authenticated user as a cached, read-only snapshot."""
+    return identity_cache.resolve(get_jwt_identity())
 
 def validate_user_ownership(user_id, resource_user_id):
     """Validate that the current user owns the resource."""
     return user_id == resource_user_id
 
-# JWT token blacklist (in production, use Redis or database)
-blacklisted_tokens = set()
-
 def is_token_blacklisted(jwt_payload):
     """Check if a JWT token is blacklisted."""
-    jti = jwt_payload['jti']
-    return jti in blacklisted_tokens
+    return token_blocklist.is_revoked(jwt_payload['jti'])
 
-def blacklist_token(jti):
-    """Add a token to the blacklist."""
-    blacklisted_tokens.add(jti)
+def blacklist_token(jwt_payload):
+    """Add a token to the blacklist until it expires."""
+    token_blocklist.revoke(jwt_payload['jti'], datetime.utcfromtimestamp(jwt_payload['exp']))
 
 def validate_password(password):
     """Validate password strength."""
@@ -0,0 +1,36 @@
+import os
+import threading
+
+class ProcessThread:
+    """A daemon thread started lazily, once in every process that uses it.
+
+    Threads do not survive fork, so under a pre-forking server each worker
+    must start its own; starting on first use rather than at import also
+    keeps the master process free of them. ``setup`` runs under the start
+    lock just before the thread starts, so callers racing the first start
+    wait until it has finished.
+    """
+
+    def __init__(self, target, name, setup=None):
+        self.target = target
+        self.name = name
+        self.setup = setup
+        self.pid = None
+        self.lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset_lock)
+
+    def ensure_started(self):
+        """Start the thread if this process has not started it yet."""
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            if self.setup is not None:
+                self.setup()
+            threading.Thread(target=self.target, name=self.name, daemon=True).start()
+            self.pid = os.getpid()
+
+    def _reset_lock(self):
+        # The lock may have been held by another thread of the parent at fork
+        self.lock = threading.Lock()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Expense list serialization benchmark.
+
+Compares building a page of expenses the original way (ORM objects,
+Expense.to_dict() and jsonify) against the column-tuple fast path used by
+GET /api/expenses, with and without a sparse fieldset.
+
+Usage:
+    python benchmarks/bench_serialization.py --rows 20000 --page-size 500
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import jsonify
+from app import create_app
+from models import db, User, Expense
+from aggregates import insert_expenses
+from serializers import EXPENSE_FIELDS, expense_rows_to_dicts, json_response, select_expense_columns, orjson
+
+def seed(rows):
+    user = User(username='bench', email='bench@example.com', password_hash='-')
+    db.session.add(user)
+    db.session.commit()
+    start = date(2020, 1, 1)
+    insert_expenses([
+        {
+            'user_id': user.id,
+            'amount': (i % 10000) / 100 + 1,
+            'description': f'Benchmark expense {i}',
+            'category': 'Food',
+            'date': start + timedelta(days=i % 1500)
+        }
+        for i in range(rows)
+    ], 1000)
+    db.session.commit()
+    return user.id
+
+def page_query(user_id, page_size):
+    return Expense.query.filter_by(user_id=user_id).order_by(
+        Expense.date.desc(), Expense.created_at.desc(), Expense.id.desc()
+    ).limit(page_size)
+
+def orm_path(user_id, page_size):
+    expenses = [expense.to_dict() for expense in page_query(user_id, page_size).all()]
+    return jsonify({'expenses': expenses}).get_data()
+
+def fast_path(user_id, page_size, fields=EXPENSE_FIELDS):
+    query, columns = select_expense_columns(page_query(user_id, page_size), fields)
+    return json_response({'expenses': expense_rows_to_dicts(query.all(), columns, fields)}).get_data()
+
+def measure(label, fn, repeat):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        db.session.expunge_all()
+        fn()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f'{label:<36} {elapsed * 1000:8.2f} ms/page')
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        user_id = seed(args.rows)
+
+        print(f'{args.rows} rows, {args.page_size} per page, JSON encoder: {"orjson" if orjson else "json"}')
+        baseline = measure('ORM + to_dict() + jsonify', lambda: orm_path(user_id, args.page_size), args.repeat)
+        fast = measure('column tuples + fast encoder', lambda: fast_path(user_id, args.page_size), args.repeat)
+        sparse = measure('column tuples, fields=id,amount,date',
+                         lambda: fast_path(user_id, args.page_size, ('id', 'amount', 'date')), args.repeat)
+        print(f'speedup: {baseline / fast:.1f}x full, {baseline / sparse:.1f}x sparse')
+
+if __name__ == '__main__':
+    main()
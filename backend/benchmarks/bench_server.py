@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Serving throughput benchmark.
+
+Starts the backend with the development server (``python run.py``) and with
+the production server (``python run.py serve``), then drives each with
+concurrent keep-alive clients requesting a page of expenses, and reports
+requests per second and latency percentiles.
+
+Both servers use a fresh SQLite database in a temporary directory. The load
+generator runs on the same machine, so absolute numbers understate what the
+servers can do; compare them relative to each other.
+
+Usage:
+    python benchmarks/bench_server.py --clients 16 --duration 15
+    python benchmarks/bench_server.py --workers 4 --threads 2
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def start_server(command, port, database):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, 'run.py'] + command,
+        cwd=BACKEND, env=env, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            request(port, 'GET', '/api/health')
+            return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'server {command} did not start')
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=30)
+
+def request(port, method, path, body=None, token=None, connection=None):
+    conn = connection or http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    if connection is None:
+        conn.close()
+    return response.status, data
+
+def seed(port, expenses):
+    user = {'username': 'bench', 'email': 'bench@example.com', 'password': 'benchmark'}
+    request(port, 'POST', '/api/auth/register', user)
+    _, data = request(port, 'POST', '/api/auth/login', {'username': 'bench', 'password': 'benchmark'})
+    token = json.loads(data)['token']
+    start = date(2024, 1, 1)
+    request(port, 'POST', '/api/expenses/bulk', {'expenses': [
+        {
+            'amount': 1 + i % 100,
+            'description': f'Benchmark expense {i}',
+            'category': 'Food',
+            'date': (start + timedelta(days=i % 365)).isoformat()
+        }
+        for i in range(expenses)
+    ]}, token=token)
+    return token
+
+def load(port, token, path, clients, duration):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        own = []
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status, _ = request(port, 'GET', path, token=token, connection=connection)
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                status = None
+            if status == 200:
+                own.append(time.perf_counter() - started)
+            else:
+                with lock:
+                    errors.append(status)
+        connection.close()
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+    return len(latencies) / duration, percentile(0.5), percentile(0.99), len(errors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--expenses', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None, help='production workers (default: run.py default)')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--path', default='/api/expenses?limit=20')
+    args = parser.parse_args()
+
+    serve = ['serve', '--threads', str(args.threads)]
+    if args.workers:
+        serve += ['--workers', str(args.workers)]
+    servers = [('development server', ['dev'], 5071), (f'run.py {" ".join(serve)}', serve, 5072)]
+
+    print(f'{args.clients} clients, {args.duration:.0f}s each, GET {args.path}, {os.cpu_count()} CPUs')
+    for label, command, port in servers:
+        with tempfile.TemporaryDirectory() as directory:
+            process = start_server(command, port, os.path.join(directory, 'bench.db'))
+            try:
+                token = seed(port, args.expenses)
+                rps, p50, p99, errors = load(port, token, args.path, args.clients, args.duration)
+            finally:
+                stop_server(process)
+        print(f'{label:<40} {rps:8.1f} req/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms   errors {errors}')
+
+if __name__ == '__main__':
+    main()
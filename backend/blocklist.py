@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from background import ProcessThread
+from models import db, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Membership tests never return a false negative, so a miss proves a token
+    was not revoked without touching the database.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        positions = self._positions(value)
+        with self.lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+class TokenBlocklist:
+    """Revoked JWTs stored in the database behind a per-process Bloom filter.
+
+    Revocations are shared by every worker through the ``revoked_tokens``
+    table. Each process folds new rows into its filter at most once per
+    ``BLOCKLIST_SYNC_INTERVAL`` seconds, so the common "not revoked" check
+    is memory-only. A background thread deletes expired rows and rebuilds
+    the filter every ``BLOCKLIST_PRUNE_INTERVAL`` seconds.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.bloom = None
+        self.last_id = 0
+        self.next_sync = 0.0
+        self.sync_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.pruner = ProcessThread(self._prune_forever, 'token-blocklist-pruner')
+        self.counters = {'checks': 0, 'bloom_negatives': 0, 'database_lookups': 0, 'false_positives': 0, 'pruned': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.capacity = app.config['BLOCKLIST_BLOOM_CAPACITY']
+        self.error_rate = app.config['BLOCKLIST_BLOOM_ERROR_RATE']
+        self.sync_interval = app.config['BLOCKLIST_SYNC_INTERVAL']
+        self.prune_interval = app.config['BLOCKLIST_PRUNE_INTERVAL']
+        # Filter state belongs to the previous app's database
+        with self.sync_lock:
+            self.bloom = None
+            self.last_id = 0
+            self.next_sync = 0.0
+        app.extensions['token_blocklist'] = self
+
+    def is_revoked(self, jti):
+        """Return True if the token with this jti has been revoked."""
+        self._ensure_pruner()
+        self._sync()
+
+        if jti not in self.bloom:
+            self._count('checks', 'bloom_negatives')
+            return False
+
+        revoked = db.session.execute(
+            select(RevokedToken.id).where(RevokedToken.jti == jti)
+        ).first() is not None
+        if revoked:
+            self._count('checks', 'database_lookups')
+        else:
+            self._count('checks', 'database_lookups', 'false_positives')
+        return revoked
+
+    def revoke(self, jti, expires_at):
+        """Revoke a token until ``expires_at`` (a naive UTC datetime)."""
+        db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # already revoked
+        self._sync()
+        with self.sync_lock:
+            self.bloom.add(jti)
+
+    def prune(self):
+        """Delete expired revocations and rebuild the filter. Returns the number deleted.
+
+        The newest row is kept even when expired: tables created before ids
+        were autoincrementing would otherwise reuse its id, and other
+        processes syncing past it would miss the new revocation.
+        """
+        newest = db.session.execute(select(func.max(RevokedToken.id))).scalar()
+        deleted = RevokedToken.query.filter(
+            RevokedToken.expires_at <= datetime.utcnow(), RevokedToken.id != newest
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        with self.lock:
+            self.counters['pruned'] += deleted
+        with self.sync_lock:
+            self._rebuild()
+        return deleted
+
+    def _sync(self):
+        if self.bloom is not None and time.monotonic() < self.next_sync:
+            return
+        if not self.sync_lock.acquire(blocking=self.bloom is None):
+            return  # another thread is syncing; the current filter is good enough
+        try:
+            if self.bloom is None or self.bloom.count > self.capacity:
+                self._rebuild()
+            else:
+                rows = db.session.execute(
+                    select(RevokedToken.id, RevokedToken.jti).where(RevokedToken.id > self.last_id)
+                ).all()
+                for row_id, jti in rows:
+                    self.bloom.add(jti)
+                    self.last_id = max(self.last_id, row_id)
+            self.next_sync = time.monotonic() + self.sync_interval
+        finally:
+            self.sync_lock.release()
+
+    def _rebuild(self):
+        # Read the high-water mark first: rows committed meanwhile are
+        # picked up by the next incremental sync instead of being missed
+        last_id = db.session.execute(select(func.max(RevokedToken.id))).scalar() or 0
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        rows = db.session.execute(
+            select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.utcnow(), RevokedToken.id <= last_id)
+        )
+        for (jti,) in rows:
+            bloom.add(jti)
+        self.bloom, self.last_id = bloom, last_id
+
+    def _ensure_pruner(self):
+        if self.prune_interval:
+            self.pruner.ensure_started()
+
+    def _prune_forever(self):
+        while True:
+            time.sleep(self.prune_interval)
+            with self.app.app_context():
+                try:
+                    self.prune()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Token blocklist pruning failed')
+
+    def _count(self, *names):
+        with self.lock:
+            for name in names:
+                self.counters[name] += 1
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['bloom_entries'] = self.bloom.count if self.bloom is not None else 0
+        return stats
+
+token_blocklist = TokenBlocklist()
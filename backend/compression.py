@@ -0,0 +1,148 @@
+import threading
+import time
+import zlib
+from flask import request
+from metrics import Counter
+
+try:
+    import brotli
+except ImportError:  # optional; only gzip is offered without it
+    brotli = None
+
+class Compression:
+    """Negotiated gzip/brotli compression of API responses.
+
+    Buffered responses are compressed when they reach the size threshold.
+    Streamed (generator) responses are compressed chunk by chunk, flushing
+    after each one, so they are never buffered in memory.
+    """
+
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        self.counters = {
+            'responses_compressed': 0,
+            'responses_skipped_small': 0,
+            'bytes_in': 0,
+            'bytes_out': 0,
+            'cpu_seconds': 0.0
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config['COMPRESSION_MIN_SIZE']
+        self.level = app.config['COMPRESSION_LEVEL']
+        self.brotli_quality = app.config['COMPRESSION_BROTLI_QUALITY']
+        self.mimetypes = set(app.config['COMPRESSION_MIMETYPES'])
+        app.extensions['compression'] = self
+        if app.config['COMPRESSION_ENABLED']:
+            app.after_request(self.compress_response)
+
+    def offered_encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def compress_response(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in self.mimetypes):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.offered_encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.iter_encoded(), encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                self._count(responses_skipped_small=1)
+                return response
+            started = time.thread_time()
+            compressor = self._compressor(encoding)
+            compressed = compressor.compress(data) + compressor.flush()
+            self._count(
+                responses_compressed=1,
+                bytes_in=len(data),
+                bytes_out=len(compressed),
+                cpu_seconds=time.thread_time() - started
+            )
+            response.set_data(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _compress_stream(self, chunks, encoding):
+        compressor = self._compressor(encoding)
+        bytes_in = bytes_out = 0
+        cpu_seconds = 0.0
+        try:
+            for chunk in chunks:
+                started = time.thread_time()
+                compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                cpu_seconds += time.thread_time() - started
+                bytes_in += len(chunk)
+                bytes_out += len(compressed)
+                if compressed:
+                    yield compressed
+            started = time.thread_time()
+            tail = compressor.flush()
+            cpu_seconds += time.thread_time() - started
+            bytes_out += len(tail)
+            yield tail
+        finally:
+            self._count(responses_compressed=1, bytes_in=bytes_in, bytes_out=bytes_out, cpu_seconds=cpu_seconds)
+
+    def _compressor(self, encoding):
+        if encoding == 'br':
+            return BrotliCompressor(self.brotli_quality)
+        # wbits 31 selects the gzip container
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def _count(self, **amounts):
+        with self.lock:
+            for name, amount in amounts.items():
+                self.counters[name] += amount
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['bytes_saved'] = stats['bytes_in'] - stats['bytes_out']
+        stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None
+        return stats
+
+    def collect_metrics(self, lines):
+        """Append the compression counters in the Prometheus text format."""
+        stats = self.stats()
+        responses = Counter('http_compression_responses_total',
+                            'Compressible responses by whether they were compressed.', ('result',))
+        responses.inc(('compressed',), stats['responses_compressed'])
+        responses.inc(('skipped_small',), stats['responses_skipped_small'])
+        responses.render(lines)
+        for name, key, help_text in (
+            ('http_compression_bytes_in_total', 'bytes_in', 'Response bytes before compression.'),
+            ('http_compression_bytes_out_total', 'bytes_out', 'Response bytes after compression.'),
+            ('http_compression_cpu_seconds_total', 'cpu_seconds', 'Thread CPU time spent compressing.'),
+        ):
+            counter = Counter(name, help_text, ())
+            counter.inc((), stats[key])
+            counter.render(lines)
+
+class BrotliCompressor:
+    """Adapt brotli.Compressor to the zlib compressobj interface."""
+
+    def __init__(self, quality):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self, mode=zlib.Z_FINISH):
+        if mode == zlib.Z_FINISH:
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+compression = Compression()
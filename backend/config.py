@@ -6,6 +6,38 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///expense_tracker.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
+    
+    # SQLite tuning - applied to every new connection. WAL lets readers run
+    # alongside a writer, NORMAL only fsyncs at checkpoints, and busy_timeout
+    # (ms) makes writers wait for the lock instead of failing
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -20000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY'
+    }
+    # Web worker processes sharing the machine; `run.py serve` sets it from --workers
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+    
+    # Log the effective engine and pragma settings when the app starts
+    DATABASE_STARTUP_CHECK = True
+    
+    # Read replica - read-only views use it when DATABASE_REPLICA_URL is set,
+    # once it has caught up with the user's own writes. SQLite file replicas
+    # are refreshed by `flask sync-replica`, or by one elected worker every
+    # REPLICA_SYNC_INTERVAL seconds (0 leaves it to the command)
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    REPLICA_SYNC_INTERVAL = float(os.environ.get('REPLICA_SYNC_INTERVAL', 0))
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
@@ -13,10 +45,109 @@ class Config:
     # CORS settings - Allow Codespaces and local development
     default_origins = 'http://localhost:3000,http://127.0.0.1:3000,https://*.github.dev,https://*.app.github.dev,https://*.githubpreview.dev'
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', default_origins).split(',')
+    CORS_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
+    CORS_ALLOW_HEADERS = ['Content-Type', 'Authorization', 'If-None-Match']
+    CORS_EXPOSE_HEADERS = ['ETag']
+    # Seconds browsers may cache a preflight (Chromium caps this at 7200)
+    CORS_MAX_AGE = 7200
     
     # Pagination
     EXPENSES_PER_PAGE = 20
     
+    # Export - rows fetched per server-side cursor batch
+    EXPORT_BATCH_SIZE = 1000
+    
+    # Bulk create - request size limit and rows per executemany batch
+    BULK_MAX_EXPENSES = 10000
+    BULK_INSERT_BATCH_SIZE = 500
+    
+    # Write coalescing - commit concurrent single-expense writes together;
+    # a batch closes at MAX_BATCH operations or MAX_WAIT seconds
+    WRITE_COALESCING_ENABLED = os.environ.get('WRITE_COALESCING', '').lower() in ('1', 'true', 'yes')
+    WRITE_COALESCING_MAX_BATCH = 64
+    WRITE_COALESCING_MAX_WAIT = 0.005
+    
+    # Statement import - rows per committed chunk and upload size limit
+    IMPORT_CHUNK_SIZE = 1000
+    MAX_CONTENT_LENGTH = 64 * 1024 * 1024
+    
+    # Analytics - longest series the series endpoint will return
+    SERIES_MAX_BUCKETS = 3660
+    
+    # Response cache - 'memory' (per process), 'sqlite' (shared file in the
+    # instance folder, for multi-worker deployments) or 'none'
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_PATH = 'response_cache.db'
+    RESPONSE_CACHE_TTL = 300
+    RESPONSE_CACHE_MAX_ENTRIES = 10000
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    
+    # Identity cache - per-process user lookups for authenticated requests;
+    # the TTL bounds how stale another worker's copy can be (0 size disables)
+    IDENTITY_CACHE_SIZE = 10000
+    IDENTITY_CACHE_TTL = 60
+    
+    # Token blocklist - revocations are stored in the database and checked
+    # through a per-process Bloom filter that picks up other workers'
+    # revocations every BLOCKLIST_SYNC_INTERVAL seconds
+    BLOCKLIST_BLOOM_CAPACITY = 100000
+    BLOCKLIST_BLOOM_ERROR_RATE = 0.001
+    BLOCKLIST_SYNC_INTERVAL = 1.0
+    BLOCKLIST_PRUNE_INTERVAL = 3600
+    
+    # Password hashing - Werkzeug method string, run in a pool of worker
+    # processes per web worker (0 hashes inline; None shares the CPUs out
+    # across the WEB_CONCURRENCY web workers, at least one each); at most
+    # WORKERS * QUEUE_FACTOR operations wait at once, others fail after
+    # QUEUE_TIMEOUT seconds
+    PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS = int(os.environ['PASSWORD_HASH_WORKERS']) if 'PASSWORD_HASH_WORKERS' in os.environ else None
+    PASSWORD_HASH_QUEUE_FACTOR = 4
+    PASSWORD_HASH_QUEUE_TIMEOUT = 5
+    
+    # Logging - 'json' or 'text' records written by a background thread;
+    # LOG_LEVELS maps logger names ('' is the root logger) to levels, and
+    # only LOG_DEBUG_SAMPLE_RATE of DEBUG records are kept
+    LOG_FORMAT = 'json'
+    LOG_LEVELS = {'': 'INFO'}
+    LOG_DEBUG_SAMPLE_RATE = 0.1
+    LOG_DEBUG_ENABLED = True
+    
+    # Metrics - per-process Prometheus metrics served at /api/metrics
+    METRICS_ENABLED = True
+    METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    METRICS_SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+    
+    # SQL diagnostics - opt-in slow-query log (with the query plan) and
+    # warnings for requests repeating one statement more than the threshold
+    SQL_DIAGNOSTICS_ENABLED = os.environ.get('SQL_DIAGNOSTICS', '').lower() in ('1', 'true', 'yes')
+    SQL_SLOW_QUERY_THRESHOLD = 0.1
+    SQL_EXPLAIN_SLOW_QUERIES = True
+    SQL_N_PLUS_ONE_THRESHOLD = 10
+    
+    # Request profiler - requests carrying PROFILER_HEADER set to
+    # PROFILER_TOKEN are profiled into PROFILER_DIR in the instance folder
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')
+    PROFILER_HEADER = 'X-Profile-Token'
+    PROFILER_DIR = 'profiles'
+    PROFILER_SAMPLE_INTERVAL = 0.001
+    
+    # Response compression - gzip, plus brotli when the package is installed
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_SIZE = 1024
+    COMPRESSION_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 4
+    COMPRESSION_MIMETYPES = [
+        'application/json',
+        'application/x-ndjson',
+        'application/msgpack',
+        'application/vnd.apache.arrow.stream',
+        'text/csv',
+        'text/html',
+        'text/plain'
+    ]
+    
     # Categories
     EXPENSE_CATEGORIES = [
         'Food',
@@ -31,15 +162,27 @@ class Config:
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
+    LOG_FORMAT = 'text'
+    LOG_LEVELS = {'': 'DEBUG', 'werkzeug': 'INFO'}
+    LOG_DEBUG_SAMPLE_RATE = 1.0
 
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
+    LOG_DEBUG_ENABLED = False
+    # Shared by all worker processes, so invalidation reaches every one
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'sqlite')
 
 class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_BINDS = {}
+    DATABASE_STARTUP_CHECK = False
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    PASSWORD_HASH_WORKERS = 0
+    LOG_LEVELS = {'': 'WARNING'}
 
 config = {
     'development': DevelopmentConfig,
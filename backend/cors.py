@@ -0,0 +1,85 @@
+import re
+from functools import lru_cache
+from flask import request, make_response
+
+def compile_origins(origins):
+    """Compile allowed origins into a (exact_origins, pattern, allow_any) matcher.
+
+    ``*`` inside an origin matches one or more host labels, so
+    ``https://*.app.github.dev`` allows any Codespaces forwarded port. A bare
+    ``*`` allows every origin.
+    """
+    exact = set()
+    patterns = []
+    allow_any = False
+    for origin in origins:
+        origin = origin.strip().rstrip('/').lower()
+        if not origin:
+            continue
+        if origin == '*':
+            allow_any = True
+        elif '*' in origin:
+            patterns.append(r'[a-z0-9-]+(?:\.[a-z0-9-]+)*'.join(re.escape(part) for part in origin.split('*')))
+        else:
+            exact.add(origin)
+    pattern = re.compile('|'.join(f'(?:{p})' for p in patterns)) if patterns else None
+    return frozenset(exact), pattern, allow_any
+
+class CORS:
+    """Cross-origin resource sharing for the API, configured from ``CORS_*`` settings.
+
+    Origins are compiled once at startup and match results are memoized.
+    Preflight requests are answered from ``before_request``, before any
+    view or JWT work, with ``Access-Control-Max-Age`` so browsers cache
+    them. Every other response, error responses included, gets the
+    ``Access-Control-Allow-*`` headers in ``after_request``.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.exact, self.pattern, self.allow_any = compile_origins(app.config['CORS_ORIGINS'])
+        self.is_allowed = lru_cache(maxsize=1024)(self._match)
+        self.preflight_headers = {
+            'Access-Control-Allow-Methods': ', '.join(app.config['CORS_METHODS']),
+            'Access-Control-Allow-Headers': ', '.join(app.config['CORS_ALLOW_HEADERS']),
+            'Access-Control-Allow-Credentials': 'true',
+            'Access-Control-Max-Age': str(app.config['CORS_MAX_AGE'])
+        }
+        self.response_headers = {
+            'Access-Control-Allow-Credentials': 'true',
+            'Access-Control-Expose-Headers': ', '.join(app.config['CORS_EXPOSE_HEADERS'])
+        }
+        app.extensions['cors'] = self
+        app.before_request_funcs.setdefault(None, []).insert(0, self.handle_preflight)
+        app.after_request(self.add_headers)
+
+    def _match(self, origin):
+        origin = origin.lower()
+        return (self.allow_any or origin in self.exact
+                or (self.pattern is not None and self.pattern.fullmatch(origin) is not None))
+
+    def handle_preflight(self):
+        if request.method != 'OPTIONS' or 'Access-Control-Request-Method' not in request.headers:
+            return None
+        origin = request.headers.get('Origin')
+        response = make_response('', 204)
+        response.vary.add('Origin')
+        if origin and self.is_allowed(origin):
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers.update(self.preflight_headers)
+        return response
+
+    def add_headers(self, response):
+        if 'Access-Control-Allow-Origin' in response.headers:
+            return response
+        origin = request.headers.get('Origin')
+        response.vary.add('Origin')
+        if origin and self.is_allowed(origin):
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers.update(self.response_headers)
+        return response
+
+cors = CORS()
@@ -0,0 +1,94 @@
+import logging
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from models import db
+
+logger = logging.getLogger(__name__)
+
+def init_db_tuning(app):
+    """Apply ``SQLITE_PRAGMAS`` to every new connection of the SQLite engines of ``models.db``.
+
+    Must run right after ``db.init_app`` so the listener is in place before
+    the first connection is opened. Other databases are left alone; their
+    pool is configured through ``SQLALCHEMY_ENGINE_OPTIONS``.
+    """
+    pragmas = app.config['SQLITE_PRAGMAS']
+    if not pragmas:
+        return
+
+    # journal_mode first: it cannot change inside a transaction and
+    # synchronous=NORMAL is only safe once WAL is on
+    statements = [f'PRAGMA {name}={value}' for name, value in sorted(pragmas.items(), key=lambda item: item[0] != 'journal_mode')]
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', set_pragmas)
+
+def database_settings(app):
+    """Read back the effective engine, pool and pragma settings."""
+    with app.app_context():
+        engine = db.engine
+        settings = {
+            'dialect': engine.dialect.name,
+            'driver': engine.driver,
+            'database': engine.url.render_as_string(hide_password=True),
+            'pool': type(engine.pool).__name__
+        }
+        if isinstance(engine.pool, QueuePool):
+            settings['pool_size'] = engine.pool.size()
+            settings['pool_timeout'] = engine.pool.timeout()
+        options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        for name in ('max_overflow', 'pool_pre_ping', 'pool_recycle'):
+            if name in options:
+                settings[name] = options[name]
+
+        if engine.dialect.name == 'sqlite':
+            with engine.connect() as connection:
+                for name in app.config['SQLITE_PRAGMAS']:
+                    settings[name] = connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+    return settings
+
+def check_database_settings(app):
+    """Log the effective database settings, warning about pragmas that did not take.
+
+    Returns the settings. In-memory databases report journal_mode 'memory'
+    and have no mmap_size, which is expected and not warned about.
+    """
+    settings = database_settings(app)
+    logger.info('database settings', extra={'settings': settings})
+
+    if settings['dialect'] != 'sqlite':
+        return settings
+    with app.app_context():
+        in_memory = db.engine.url.database in (None, '', ':memory:')
+    for name, wanted in app.config['SQLITE_PRAGMAS'].items():
+        actual = settings.get(name)
+        if name in _IN_MEMORY_PRAGMAS and in_memory:
+            continue
+        if not _pragma_matches(name, wanted, actual):
+            logger.warning('SQLite pragma not applied', extra={'pragma': name, 'wanted': wanted, 'actual': actual})
+    return settings
+
+# Pragmas that do not apply to in-memory databases
+_IN_MEMORY_PRAGMAS = frozenset({'journal_mode', 'mmap_size'})
+
+# SQLite reports these pragmas as numbers
+_PRAGMA_NUMBERS = {
+    'synchronous': {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3},
+    'temp_store': {'DEFAULT': 0, 'FILE': 1, 'MEMORY': 2}
+}
+
+def _pragma_matches(name, wanted, actual):
+    if isinstance(wanted, str):
+        wanted = _PRAGMA_NUMBERS.get(name, {}).get(wanted.upper(), wanted)
+    return str(wanted).lower() == str(actual).lower()
@@ -0,0 +1,46 @@
+import hashlib
+from functools import wraps
+from flask import request, make_response
+from flask_jwt_extended import get_jwt_identity
+from aggregates import request_data_version
+
+def data_version_etag(user_id, version):
+    """Build the strong ETag for the current request at a user's data version.
+
+    The request path, query string and the headers that select the
+    representation are part of the tag, so different pages, formats or
+    content encodings of the same data never share one.
+    """
+    key = '\n'.join((
+        str(user_id),
+        str(version),
+        request.full_path,
+        request.headers.get('Accept', ''),
+        request.headers.get('Accept-Encoding', '')
+    ))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def etag_by_data_version(f):
+    """Serve conditional GETs for a user's expense data.
+
+    Must be applied below ``jwt_required``. The ETag only depends on the
+    user's data version, so a matching ``If-None-Match`` is answered with
+    304 after a single primary key lookup, without running the view.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user_id = int(get_jwt_identity())
+        etag = data_version_etag(user_id, request_data_version(user_id))
+
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return decorated_function
@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HashingBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+
+class PasswordHasher:
+    """Runs password KDF work in a bounded pool of worker processes.
+
+    Request threads only wait on the result, so a burst of logins cannot
+    pin every web worker's CPU. ``PASSWORD_HASH_METHOD`` is a Werkzeug
+    method string; hashes made with different parameters are reported by
+    ``needs_rehash`` so they can be upgraded on the next successful login.
+    With ``PASSWORD_HASH_WORKERS`` set to 0 hashing runs inline; left unset,
+    each web worker gets ``cpu_count // WEB_CONCURRENCY`` pool processes (at
+    least one), so all pools together stay close to the number of CPUs.
+    """
+
+    def __init__(self, app=None):
+        self.method = 'scrypt'
+        self.method_prefix = None
+        self.workers = 0
+        self.executor = None
+        self.executor_pid = None
+        self.queue_timeout = 5
+        self.slots = threading.BoundedSemaphore(4)
+        self.lock = threading.Lock()
+        self.counters = {
+            'hashes': 0,
+            'verifications': 0,
+            'rehashes': 0,
+            'rejected': 0,
+            'pending': 0,
+            'max_pending': 0,
+            'seconds': 0.0,
+            'max_seconds': 0.0
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.workers = pool_size(app.config['PASSWORD_HASH_WORKERS'], app.config['WEB_CONCURRENCY'])
+        self.queue_timeout = app.config['PASSWORD_HASH_QUEUE_TIMEOUT']
+        self.slots = threading.BoundedSemaphore(max(1, self.workers) * app.config['PASSWORD_HASH_QUEUE_FACTOR'])
+        # Werkzeug fills in default parameters, e.g. 'scrypt' -> 'scrypt:32768:8:1'
+        self.method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        """Hash a password with the configured method."""
+        return self._run('hashes', generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash."""
+        return self._run('verifications', check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Return True if a stored hash was made with other parameters than the configured ones."""
+        return password_hash.split('$', 1)[0] != self.method_prefix
+
+    def count_rehash(self):
+        with self.lock:
+            self.counters['rehashes'] += 1
+
+    def _run(self, counter, fn, *args):
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            with self.lock:
+                self.counters['rejected'] += 1
+            raise HashingBusy('Too many password operations in progress')
+
+        with self.lock:
+            self.counters['pending'] += 1
+            self.counters['max_pending'] = max(self.counters['max_pending'], self.counters['pending'])
+        started = time.perf_counter()
+        try:
+            if not self.workers:
+                return fn(*args)
+            return self._executor().submit(fn, *args).result()
+        finally:
+            elapsed = time.perf_counter() - started
+            self.slots.release()
+            with self.lock:
+                self.counters['pending'] -= 1
+                self.counters[counter] += 1
+                self.counters['seconds'] += elapsed
+                self.counters['max_seconds'] = max(self.counters['max_seconds'], elapsed)
+
+    def _executor(self):
+        # One pool per process; spawned children are safe to start from a threaded server
+        with self.lock:
+            if self.executor is None or self.executor_pid != os.getpid():
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+                self.executor_pid = os.getpid()
+            return self.executor
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        operations = stats['hashes'] + stats['verifications']
+        stats['mean_ms'] = round(stats.pop('seconds') / operations * 1000, 2) if operations else None
+        stats['max_ms'] = round(stats.pop('max_seconds') * 1000, 2)
+        stats['method'] = self.method_prefix
+        stats['workers'] = self.workers
+        return stats
+
+def pool_size(workers, web_concurrency):
+    """Hashing processes per web worker: ``workers`` if set, else the CPUs shared out."""
+    if workers is not None:
+        return workers
+    return max(1, (os.cpu_count() or 1) // max(1, web_concurrency))
+
+password_hasher = PasswordHasher()
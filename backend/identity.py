@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from models import db, User
+
+class CachedUser:
+    """Read-only snapshot of the User fields needed to serve a request."""
+
+    __slots__ = ('id', 'username', 'email', 'created_at', 'updated_at')
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.created_at = user.created_at
+        self.updated_at = user.updated_at
+
+    def to_dict(self):
+        """Convert the snapshot to the same dictionary as User.to_dict()."""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+class IdentityCache:
+    """Bounded, TTL'd per-process cache of users keyed by JWT identity.
+
+    Lets authenticated requests confirm their user without a database round
+    trip. Profile and password changes invalidate explicitly; deleted users
+    are dropped when the deleting transaction commits. Other worker
+    processes see changes once their entry expires.
+    """
+
+    def __init__(self, app=None):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.max_size = 0
+        self.ttl = 0
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_size = app.config['IDENTITY_CACHE_SIZE']
+        self.ttl = app.config['IDENTITY_CACHE_TTL']
+        app.extensions['identity_cache'] = self
+        if not event.contains(db.session, 'after_flush', _track_deleted_users):
+            event.listen(db.session, 'after_flush', _track_deleted_users)
+            event.listen(db.session, 'after_commit', _forget_deleted_users)
+
+    def resolve(self, identity):
+        """Return the CachedUser for a JWT identity, or None if the user does not exist."""
+        if identity is None:
+            return None
+        user_id = int(identity)
+
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(user_id)
+                self.counters['hits'] += 1
+                return entry[1]
+            self.counters['misses'] += 1
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        cached = CachedUser(user)
+
+        if self.max_size:
+            with self.lock:
+                self.entries[user_id] = (time.monotonic() + self.ttl, cached)
+                self.entries.move_to_end(user_id)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                    self.counters['evictions'] += 1
+        return cached
+
+    def invalidate(self, user_id):
+        """Forget a user, e.g. after their profile or password changes."""
+        with self.lock:
+            self.entries.pop(int(user_id), None)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries))
+
+identity_cache = IdentityCache()
+
+def _track_deleted_users(session, flush_context):
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, User)]
+    if deleted:
+        session.info.setdefault('deleted_user_ids', set()).update(deleted)
+
+def _forget_deleted_users(session):
+    for user_id in session.info.pop('deleted_user_ids', ()):
+        identity_cache.invalidate(user_id)
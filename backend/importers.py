@@ -0,0 +1,198 @@
+"""
+Bank statement import.
+
+Statement files (CSV, OFX, QIF) are parsed incrementally into raw expense
+records, validated with the same rules as the expense routes and written in
+bounded chunks, so a large upload never has to fit in memory.
+"""
+
+import csv
+import re
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from aggregates import insert_expenses
+from models import db
+from response_cache import response_cache
+from validation import validate_expense_data
+
+IMPORT_FORMATS = ('csv', 'ofx', 'qif')
+
+# Errors kept in the result; the remainder are only counted
+MAX_REPORTED_ERRORS = 100
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+OFX_READ_SIZE = 64 * 1024
+
+def parse_amount(value):
+    """Parse a statement amount such as '-1,234.50' or '$12.00' into a Decimal."""
+    if value is None:
+        return None
+    cleaned = re.sub(r'[^0-9.\-]', '', str(value))
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        return None
+
+def parse_date(value, date_format):
+    """Convert a statement date to YYYY-MM-DD, leaving unparseable values as they are."""
+    value = (value or '').strip()
+    try:
+        return datetime.strptime(value, date_format).strftime('%Y-%m-%d')
+    except ValueError:
+        return value
+
+def parse_csv(text_stream, date_column='date', amount_column='amount',
+              description_column='description', category_column='category',
+              date_format='%Y-%m-%d', invert_amounts=False):
+    """Yield raw expense records from a CSV statement with a header row."""
+    for row in csv.DictReader(text_stream):
+        amount = parse_amount(row.get(amount_column))
+        if amount is not None and invert_amounts:
+            amount = -amount
+        yield {
+            'amount': amount,
+            'description': row.get(description_column) or '',
+            'category': row.get(category_column) or '',
+            'date': parse_date(row.get(date_column), date_format)
+        }
+
+def parse_ofx(text_stream):
+    """Yield raw expense records from an OFX statement (SGML or XML flavour).
+
+    The file is tokenized in fixed-size reads, so OFX files that put the
+    whole statement on a single line are handled without loading it at once.
+    Debits are negative in OFX and become positive expense amounts.
+    """
+    transaction = None
+    pending = ''
+    while True:
+        chunk = text_stream.read(OFX_READ_SIZE)
+        pending += chunk
+        # Keep a possibly incomplete trailing tag for the next read
+        cut = max(pending.rfind('<'), 0) if chunk else len(pending)
+        complete, pending = pending[:cut], pending[cut:]
+
+        for closing, tag, value in OFX_TAG.findall(complete):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and transaction is not None:
+                    yield _ofx_record(transaction)
+                    transaction = None
+                elif not closing:
+                    transaction = {}
+            elif transaction is not None and not closing:
+                transaction[tag] = value.strip()
+
+        if not chunk:
+            break
+
+def _ofx_record(transaction):
+    amount = parse_amount(transaction.get('TRNAMT'))
+    return {
+        'amount': -amount if amount is not None else None,
+        'description': transaction.get('NAME') or transaction.get('MEMO') or '',
+        'category': '',
+        'date': parse_date(transaction.get('DTPOSTED', '')[:8], '%Y%m%d')
+    }
+
+def parse_qif(text_stream, date_format='%m/%d/%Y'):
+    """Yield raw expense records from a QIF statement.
+
+    Payments are negative in QIF and become positive expense amounts.
+    """
+    record = {}
+    for line in text_stream:
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('!'):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == '^':
+            if record:
+                yield _qif_record(record, date_format)
+            record = {}
+        else:
+            record[code] = value
+    if record:
+        yield _qif_record(record, date_format)
+
+def _qif_record(record, date_format):
+    amount = parse_amount(record.get('T') or record.get('U'))
+    # Quicken writes two-digit years after the 2000s as 1/15'24
+    raw_date = record.get('D', '').replace("'", '/20').replace(' ', '')
+    return {
+        'amount': -amount if amount is not None else None,
+        'description': record.get('P') or record.get('M') or '',
+        'category': record.get('L', ''),
+        'date': parse_date(raw_date, date_format)
+    }
+
+class ExpenseImporter:
+    """Validate raw expense records and write them in bounded chunks.
+
+    ``run`` is a generator that yields a progress report after every chunk
+    is committed; the last report is the final result.
+    """
+
+    def __init__(self, user_id, categories, chunk_size, default_category='Other'):
+        self.user_id = user_id
+        self.categories = categories
+        self.chunk_size = chunk_size
+        self.default_category = default_category
+
+    def run(self, records):
+        progress = {
+            'rows_read': 0,
+            'imported': 0,
+            'skipped': 0,
+            'failed': 0,
+            'errors': [],
+            'elapsed_seconds': 0.0,
+            'rows_per_second': 0.0,
+            'done': False
+        }
+        started = time.perf_counter()
+        chunk = []
+
+        for record in records:
+            progress['rows_read'] += 1
+
+            # Credits and zero-value lines are not expenses
+            if record['amount'] is not None and record['amount'] <= 0:
+                progress['skipped'] += 1
+                continue
+
+            if record['category'].strip() not in self.categories:
+                record['category'] = self.default_category
+
+            values, error = validate_expense_data(record, self.categories)
+            if error:
+                progress['failed'] += 1
+                if len(progress['errors']) < MAX_REPORTED_ERRORS:
+                    progress['errors'].append({'row': progress['rows_read'], 'error': error})
+                continue
+
+            chunk.append(dict(values, user_id=self.user_id))
+            if len(chunk) >= self.chunk_size:
+                self._write(chunk, progress, started)
+                chunk = []
+                yield dict(progress)
+
+        if chunk:
+            self._write(chunk, progress, started)
+        self._update_timing(progress, started)
+        progress['done'] = True
+        yield progress
+
+    def _write(self, chunk, progress, started):
+        insert_expenses(chunk, len(chunk))
+        db.session.commit()
+        response_cache.invalidate_user(self.user_id, 'expenses')
+        progress['imported'] += len(chunk)
+        self._update_timing(progress, started)
+
+    @staticmethod
+    def _update_timing(progress, started):
+        elapsed = time.perf_counter() - started
+        progress['elapsed_seconds'] = round(elapsed, 3)
+        progress['rows_per_second'] = round(progress['rows_read'] / elapsed, 1) if elapsed else 0.0
@@ -0,0 +1,169 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self, lines):
+        lines.append(f'# HELP {self.name} {self.help_text}')
+        lines.append(f'# TYPE {self.name} histogram')
+        for labels, (counts, total) in sorted(self.series.items()):
+            label_text = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self, lines):
+        lines.append(f'# HELP {self.name} {self.help_text}')
+        lines.append(f'# TYPE {self.name} counter')
+        for labels, value in sorted(self.series.items()):
+            label_text = _labels(self.label_names, labels)
+            lines.append(f'{self.name}{{{label_text}}} {value}' if label_text else f'{self.name} {value}')
+
+def _labels(names, values):
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    )
+
+class Metrics:
+    """Per-process request and SQL instrumentation in Prometheus text format.
+
+    Requests are labelled by blueprint, endpoint and method, so the number
+    of series is bounded by the route table; unmatched URLs share a single
+    label. SQL statements are counted and timed through engine events and
+    attributed to the request that ran them. Other extensions add their own
+    counters through collectors, called with the output lines on each render.
+    """
+
+    ENDPOINT_LABELS = ('blueprint', 'endpoint', 'method')
+
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        self.metrics = []
+        self.collectors = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['metrics'] = self
+        self.metrics = []
+        self.collectors = []
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        latency_buckets = app.config['METRICS_LATENCY_BUCKETS']
+        self.request_seconds = Histogram(
+            'http_request_duration_seconds', 'Request latency until the response is returned.',
+            self.ENDPOINT_LABELS, latency_buckets)
+        self.responses = Counter(
+            'http_responses_total', 'Responses by status code.', self.ENDPOINT_LABELS + ('status',))
+        self.sql_queries = Histogram(
+            'http_request_sql_queries', 'SQL statements executed per request.',
+            self.ENDPOINT_LABELS, app.config['METRICS_SQL_COUNT_BUCKETS'])
+        self.sql_seconds = Histogram(
+            'http_request_sql_duration_seconds', 'Time spent in SQL statements per request.',
+            self.ENDPOINT_LABELS, latency_buckets)
+        self.metrics = [self.request_seconds, self.responses, self.sql_queries, self.sql_seconds]
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        with app.app_context():
+            for engine in db.engines.values():
+                self.instrument_engine(engine)
+
+    def instrument_engine(self, engine):
+        """Time every statement run on ``engine`` and attribute it to the current request."""
+        if event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+            return
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+
+    def add_collector(self, collect):
+        """Call ``collect(lines)`` on every render to append further metrics."""
+        self.collectors.append(collect)
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_seconds = 0.0
+
+    def _finish_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        labels = (request.blueprint or '', request.endpoint or 'unmatched', request.method)
+
+        with self.lock:
+            self.request_seconds.observe(labels, elapsed)
+            self.responses.inc(labels + (response.status_code,))
+            self.sql_queries.observe(labels, g.sql_queries)
+            self.sql_seconds.observe(labels, g.sql_seconds)
+        return response
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                metric.render(lines)
+        for collect in self.collectors:
+            collect(lines)
+        return '\n'.join(lines) + '\n'
+
+    def response(self):
+        return Response(self.render(), content_type=PROMETHEUS_MIMETYPE)
+
+metrics = Metrics()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_request_context() and 'sql_queries' in g:
+        g.sql_queries += 1
+        g.sql_seconds += elapsed
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_started'):
+        connection.info['query_started'].pop()
@@ -1,8 +1,10 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
+from hashing import password_hasher
+from read_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     """User model for authentication and user management."""
@@ -20,11 +22,15 @@ class User(db.Model):
     
     def set_password(self, password):
         """Hash and set the user's password."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """Check if the provided password matches the stored hash."""
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Check if the stored hash uses other parameters than the configured ones."""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def to_dict(self):
         """Convert user object to dictionary."""
@@ -52,6 +58,11 @@ class Expense(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Matches the list ordering so keyset pages are a single index range scan
+    __table_args__ = (
+        db.Index('ix_expenses_user_date_created_id', user_id, date.desc(), created_at.desc(), id.desc()),
+    )
+    
     def to_dict(self):
         """Convert expense object to dictionary."""
         return {
@@ -66,4 +77,90 @@ class Expense(db.Model):
         }
     
     def __repr__(self):
-        return f'<Expense {self.id}: {self.description} - ${self.amount}>'
\ No newline at end of file
+        return f'<Expense {self.id}: {self.description} - ${self.amount}>'
+
+class ExpenseCount(db.Model):
+    """Per-user, per-category expense counter maintained on every write.
+
+    Lets list and summary endpoints report totals without a COUNT(*) scan.
+    """
+    __tablename__ = 'expense_counts'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ExpenseCount {self.user_id}/{self.category}: {self.count}>'
+
+class ExpenseRollup(db.Model):
+    """Per-user, per-category, per-month expense totals maintained on every write.
+
+    Lets the summary endpoint aggregate a handful of rows instead of scanning
+    the user's expenses.
+    """
+    __tablename__ = 'expense_rollups'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ExpenseRollup {self.user_id}/{self.category}/{self.month}: {self.count} totalling {self.total}>'
+
+# Stands in for a missing created_at; sorts where NULL did, below every real timestamp
+MISSING_CREATED_AT = datetime(1970, 1, 1)
+
+def ensure_expense_indexes(connection):
+    """Create the expense indexes missing from an existing database.
+
+    ``create_all`` skips tables that already exist, so indexes added to
+    Expense later are only created here. Also fills in missing created_at
+    values, which keyset cursors cannot carry.
+    """
+    for index in Expense.__table__.indexes:
+        index.create(connection, checkfirst=True)
+    connection.execute(
+        Expense.__table__.update()
+        .where(Expense.__table__.c.created_at.is_(None))
+        .values(created_at=MISSING_CREATED_AT)
+    )
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_expense_indexes(target, connection, **kw):
+    """Bring the expense indexes up to date whenever the tables are created."""
+    ensure_expense_indexes(connection)
+
+class UserDataVersion(db.Model):
+    """Per-user counter bumped by every write to a user's expenses or account.
+
+    Identifies the state of a user's data for conditional GET requests, and
+    tells read routing whether a replica has caught up with the user.
+    """
+    __tablename__ = 'user_data_versions'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UserDataVersion {self.user_id}: {self.version}>'
+
+class RevokedToken(db.Model):
+    """A revoked JWT, kept until the token would have expired anyway.
+
+    Shared by every worker process; the autoincrementing id lets each
+    process pick up revocations made elsewhere incrementally.
+    """
+    __tablename__ = 'revoked_tokens'
+    # Never hand out an id again once its row is pruned
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
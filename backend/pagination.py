@@ -0,0 +1,31 @@
+import base64
+import json
+from datetime import datetime, date
+
+def encode_cursor(expense_date, created_at, expense_id):
+    """Encode the sort key of the last row on a page into an opaque cursor."""
+    payload = json.dumps([
+        expense_date.isoformat(),
+        created_at.isoformat(),
+        expense_id
+    ], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor.
+
+    Returns a (date, created_at, id) tuple, or None if the cursor is malformed.
+    Every part is required: a NULL in the row comparison would match no rows.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        expense_date, created_at, expense_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        )
+        return (
+            date.fromisoformat(expense_date),
+            datetime.fromisoformat(created_at),
+            int(expense_id)
+        )
+    except (ValueError, TypeError, UnicodeError):
+        return None
@@ -0,0 +1,125 @@
+import cProfile
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class RequestProfiler:
+    """Profile single requests that carry the configured token header.
+
+    Wraps the WSGI app only when ``PROFILER_ENABLED`` is set and a
+    ``PROFILER_TOKEN`` is configured; other requests just pay for one
+    environ lookup. A profiled request is run under cProfile while a
+    sampling thread records its stacks, and two files are written to
+    ``PROFILER_DIR``: a ``.prof`` file for pstats/snakeviz and a
+    ``.folded`` collapsed-stack file for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['profiler'] = self
+        self.token = app.config['PROFILER_TOKEN']
+        if not app.config['PROFILER_ENABLED'] or not self.token:
+            return
+
+        self.environ_key = 'HTTP_' + app.config['PROFILER_HEADER'].upper().replace('-', '_')
+        self.interval = app.config['PROFILER_SAMPLE_INTERVAL']
+        self.directory = os.path.join(app.instance_path, app.config['PROFILER_DIR'])
+        self.wsgi_app = app.wsgi_app
+        app.wsgi_app = self
+
+    def __call__(self, environ, start_response):
+        token = environ.get(self.environ_key)
+        if token is None or not hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8')):
+            return self.wsgi_app(environ, start_response)
+        # One profiled request at a time per process; others run normally
+        if not self.lock.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+        try:
+            return self._profile(environ, start_response)
+        finally:
+            self.lock.release()
+
+    def _profile(self, environ, start_response):
+        profile = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        started = time.perf_counter()
+
+        sampler.start()
+        profile.enable()
+        try:
+            # The body is consumed here so streamed responses are profiled too
+            app_iter = self.wsgi_app(environ, start_response)
+            try:
+                body = b''.join(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        finally:
+            profile.disable()
+            sampler.stop()
+
+        elapsed = time.perf_counter() - started
+        name = self._write(environ, profile, sampler)
+        logger.info('request profiled', extra={
+            'method': environ.get('REQUEST_METHOD'),
+            'path': environ.get('PATH_INFO'),
+            'duration_ms': round(elapsed * 1000, 2),
+            'samples': sum(sampler.stacks.values()),
+            'profile': name
+        })
+        return [body]
+
+    def _write(self, environ, profile, sampler):
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', environ.get('PATH_INFO', '')).strip('_') or 'root'
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{environ.get('REQUEST_METHOD', 'GET')}-{slug}"
+        base = os.path.join(self.directory, name)
+
+        profile.dump_stats(base + '.prof')
+        with open(base + '.folded', 'w') as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        return name
+
+class StackSampler:
+    """Samples one thread's stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='request-profiler-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+request_profiler = RequestProfiler()
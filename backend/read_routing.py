@@ -0,0 +1,214 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import g, has_app_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Delete, Insert, Update, event, select
+from sqlalchemy.exc import DBAPIError
+from background import ProcessThread
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; every process there syncs on its own
+    fcntl = None
+
+REPLICA_BIND = 'replica'
+
+logger = logging.getLogger(__name__)
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica bind while ``g.read_replica`` is set.
+
+    Flushes and INSERT, UPDATE and DELETE statements always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and has_app_context() and g.get('read_replica')
+                and not self._flushing and not isinstance(clause, (Insert, Update, Delete))):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+class ReadRouting:
+    """Route read-only requests to a replica database, with read-your-writes.
+
+    Enabled when ``SQLALCHEMY_BINDS`` has a ``replica`` entry (set from
+    ``DATABASE_REPLICA_URL``). Views decorated with ``read_replica`` read from
+    the replica once it has caught up with the user's latest write, and from
+    the primary before then, so users always see their own changes. Both
+    databases are asked for the user's data version, which every write
+    bumps, so this holds whichever worker process handled the write.
+
+    When both databases are SQLite files, the replica is refreshed from the
+    primary with SQLite's online backup API every ``REPLICA_SYNC_INTERVAL``
+    seconds by a background thread (0, the default, leaves it to
+    ``flask sync-replica``). Only one process at a time syncs, elected
+    through a lock file next to the replica.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        # The first copy is made before any read is routed to the replica
+        self.syncer = ProcessThread(self._sync_forever, 'replica-sync', setup=self._sync_if_leader)
+        self.leader_lock = None
+        self.leader_pid = None
+        self.last_sync = None
+        self.counters = {'replica_reads': 0, 'primary_reads': 0, 'syncs': 0, 'sync_failures': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from models import db
+
+        self.app = app
+        self.enabled = REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {})
+        self.sync_interval = app.config['REPLICA_SYNC_INTERVAL']
+        app.extensions['read_routing'] = self
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            self.primary = db.engines[None]
+            self.replica = db.engines[REPLICA_BIND]
+        if self.replica.dialect.name == 'sqlite':
+            event.listen(self.replica, 'connect', _set_query_only)
+        if self.sync_interval and self._sqlite_paths():
+            app.before_request(self.syncer.ensure_started)
+
+    def use_replica(self, user_id):
+        """Whether reads for ``user_id`` may go to the replica right now.
+
+        Only when the replica has the user's current data version; a replica
+        that cannot be read (e.g. not synced yet) counts as behind. The
+        primary's version is looked up through ``request_data_version``, so
+        views checking ETags against it do not query it again.
+        """
+        from aggregates import request_data_version, versions_table
+
+        if not self.enabled:
+            return False
+        primary_version = request_data_version(user_id)
+        try:
+            with self.replica.connect() as connection:
+                replica_version = connection.execute(
+                    select(versions_table.c.version).where(versions_table.c.user_id == user_id)
+                ).scalar() or 0
+        except DBAPIError:
+            logger.warning('replica unavailable, reading from the primary', exc_info=True)
+            replica_version = -1
+        current = replica_version >= primary_version
+        with self.lock:
+            self.counters['replica_reads' if current else 'primary_reads'] += 1
+        return current
+
+    def _sqlite_paths(self):
+        if not self.enabled or self.primary.dialect.name != 'sqlite' or self.replica.dialect.name != 'sqlite':
+            return None
+        paths = self.primary.url.database, self.replica.url.database
+        if any(path in (None, '', ':memory:') for path in paths):
+            return None
+        return paths
+
+    def sync(self):
+        """Copy the primary into the replica with SQLite's online backup API.
+
+        Readers of the replica see either the old or the new copy, never a
+        mix. Writers on the primary are not blocked in WAL mode.
+        """
+        paths = self._sqlite_paths()
+        if paths is None:
+            raise RuntimeError('Replica sync needs file-based SQLite primary and replica databases')
+
+        started = time.perf_counter()
+        with self.sync_lock:
+            source = sqlite3.connect(paths[0])
+            target = sqlite3.connect(paths[1])
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            self.last_sync = time.time()
+        duration = time.perf_counter() - started
+        with self.lock:
+            self.counters['syncs'] += 1
+        logger.debug('replica synced', extra={'duration_ms': round(duration * 1000, 2)})
+        return duration
+
+    def is_sync_leader(self):
+        """Whether this process is the one keeping the replica in sync.
+
+        Processes compete for an exclusive lock on ``<replica>.sync-lock``;
+        the winner holds it until it exits, when another one takes over.
+        """
+        if fcntl is None or self.leader_pid == os.getpid():
+            return True
+        lock_file = open(self._sqlite_paths()[1] + '.sync-lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.leader_lock = lock_file
+        self.leader_pid = os.getpid()
+        logger.info('replica sync leader elected')
+        return True
+
+    def _sync_forever(self):
+        while True:
+            time.sleep(self.sync_interval)
+            self._sync_if_leader()
+
+    def _sync_if_leader(self):
+        try:
+            leader = self.is_sync_leader()
+        except OSError:
+            logger.exception('replica sync lock failed')
+            return
+        if leader:
+            self._sync_once()
+
+    def _sync_once(self):
+        try:
+            self.sync()
+        except Exception:
+            with self.lock:
+                self.counters['sync_failures'] += 1
+            logger.exception('replica sync failed')
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['enabled'] = self.enabled
+        stats['sync_leader'] = self.leader_pid == os.getpid()
+        stats['seconds_since_sync'] = round(time.time() - self.last_sync, 3) if self.last_sync else None
+        return stats
+
+def _set_query_only(dbapi_connection, connection_record):
+    # Reads only: a write routed here by mistake fails instead of diverging
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA query_only=ON')
+    finally:
+        cursor.close()
+
+def read_replica(f):
+    """Serve a read-only view from the replica when read routing is enabled.
+
+    Must be applied below ``jwt_required`` so that token checks still read
+    the primary and the user is known.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.read_replica = read_routing.use_replica(int(get_jwt_identity()))
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+read_routing = ReadRouting()
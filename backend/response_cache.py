@@ -0,0 +1,307 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import request, make_response
+from flask_jwt_extended import get_jwt_identity
+from aggregates import request_data_version
+
+# Namespaces whose data is covered by the per-user data version
+VERSIONED_NAMESPACES = ('expenses', 'profile')
+
+class LRUCache:
+    """In-process LRU cache with a TTL and entry and byte limits.
+
+    Keys are (user_id, namespace, request_key) tuples; an index of the keys
+    held per (user_id, namespace) makes invalidation exact and cheap.
+    """
+
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.owners = {}
+        self.size = 0
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.counters['expirations'] += 1
+                self.counters['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return value
+
+    def set(self, key, value):
+        if len(value[0]) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.owners.setdefault(key[:2], set()).add(key)
+            self.size += len(value[0])
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.counters['evictions'] += 1
+
+    def invalidate(self, user_id, namespace):
+        with self.lock:
+            for key in list(self.owners.get((user_id, namespace), ())):
+                self._remove(key)
+                self.counters['invalidations'] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, backend='memory', entries=len(self.entries), bytes=self.size)
+
+    def _remove(self, key):
+        expires_at, value = self.entries.pop(key)
+        self.size -= len(value[0])
+        owned = self.owners.get(key[:2])
+        if owned is not None:
+            owned.discard(key)
+            if not owned:
+                del self.owners[key[:2]]
+
+class SQLiteCache:
+    """Cache stored in a SQLite file so that every worker process shares it.
+
+    Triggers keep a running entry count and byte size, so writes only look
+    for entries to evict once a limit is exceeded. Counters are per process,
+    since each worker serves its own requests.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS response_cache ('
+        'user_id INTEGER NOT NULL, namespace TEXT NOT NULL, request_key TEXT NOT NULL, '
+        'expires_at REAL NOT NULL, body BLOB NOT NULL, status INTEGER NOT NULL, mimetype TEXT NOT NULL, '
+        'vary TEXT, PRIMARY KEY (user_id, namespace, request_key))',
+        'CREATE INDEX IF NOT EXISTS response_cache_expires_at ON response_cache (expires_at)',
+        'CREATE TABLE IF NOT EXISTS response_cache_totals ('
+        'id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL, bytes INTEGER NOT NULL)',
+        'INSERT OR IGNORE INTO response_cache_totals '
+        'SELECT 0, COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM response_cache',
+        'CREATE TRIGGER IF NOT EXISTS response_cache_inserted AFTER INSERT ON response_cache BEGIN '
+        'UPDATE response_cache_totals SET entries = entries + 1, bytes = bytes + LENGTH(NEW.body); END',
+        'CREATE TRIGGER IF NOT EXISTS response_cache_updated AFTER UPDATE OF body ON response_cache BEGIN '
+        'UPDATE response_cache_totals SET bytes = bytes + LENGTH(NEW.body) - LENGTH(OLD.body); END',
+        'CREATE TRIGGER IF NOT EXISTS response_cache_deleted AFTER DELETE ON response_cache BEGIN '
+        'UPDATE response_cache_totals SET entries = entries - 1, bytes = bytes - LENGTH(OLD.body); END'
+    )
+    COLUMNS = ('user_id', 'namespace', 'request_key', 'expires_at', 'body', 'status', 'mimetype', 'vary')
+
+    def __init__(self, path, max_entries, max_bytes, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+        # Not kept: connections opened here would be inherited by forked workers
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            columns = tuple(row[1] for row in connection.execute('PRAGMA table_info(response_cache)'))
+            if columns and columns != self.COLUMNS:
+                # Cache files from an older layout are simply started afresh
+                connection.execute('DROP TABLE response_cache')
+                connection.execute('DROP TABLE IF EXISTS response_cache_totals')
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT expires_at, body, status, mimetype, vary FROM response_cache '
+            'WHERE user_id = ? AND namespace = ? AND request_key = ?', key
+        ).fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+        expires_at, body, status, mimetype, vary = row
+        if expires_at <= time.time():
+            self._count('expirations')
+            self._count('misses')
+            return None
+        self._count('hits')
+        return bytes(body), status, mimetype, vary
+
+    def set(self, key, value):
+        body, status, mimetype, vary = value
+        if len(body) > self.max_bytes:
+            return
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                'INSERT INTO response_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (user_id, namespace, request_key) DO UPDATE SET '
+                'expires_at = excluded.expires_at, body = excluded.body, status = excluded.status, '
+                'mimetype = excluded.mimetype, vary = excluded.vary',
+                key + (time.time() + self.ttl, body, status, mimetype, vary)
+            )
+            evicted = self._evict(connection)
+        if evicted:
+            self._count('evictions', evicted)
+
+    def _evict(self, connection):
+        # Entries closest to expiry go first, expired ones included, until
+        # both the entry and the byte limits hold
+        entries, size = connection.execute('SELECT entries, bytes FROM response_cache_totals').fetchone()
+        excess_entries, excess_bytes = entries - self.max_entries, size - self.max_bytes
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return 0
+        rowids = []
+        cursor = connection.execute('SELECT rowid, LENGTH(body) FROM response_cache ORDER BY expires_at, rowid')
+        for rowid, length in cursor:
+            if len(rowids) >= excess_entries and excess_bytes <= 0:
+                break
+            rowids.append((rowid,))
+            excess_bytes -= length
+        cursor.close()
+        connection.executemany('DELETE FROM response_cache WHERE rowid = ?', rowids)
+        return len(rowids)
+
+    def invalidate(self, user_id, namespace):
+        connection = self._connection()
+        with connection:
+            removed = connection.execute(
+                'DELETE FROM response_cache WHERE user_id = ? AND namespace = ?', (user_id, namespace)
+            ).rowcount
+        if removed:
+            self._count('invalidations', removed)
+
+    def stats(self):
+        entries, size = self._connection().execute(
+            'SELECT entries, bytes FROM response_cache_totals'
+        ).fetchone()
+        with self.lock:
+            return dict(self.counters, backend='sqlite', entries=entries, bytes=size)
+
+    def _connection(self):
+        # Keyed by pid as well as thread: SQLite connections must not be
+        # used across fork, and threads' locals are copied into children
+        connection, pid = getattr(self.local, 'connection', (None, None))
+        if connection is None or pid != os.getpid():
+            connection = self._connect()
+            self.local.connection = connection, os.getpid()
+        return connection
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+class ResponseCache:
+    """Per-user cache of JSON responses from read endpoints.
+
+    Entries are keyed by user, a namespace naming the data they were built
+    from, and the normalized request. Write paths call ``invalidate_user``
+    for the namespaces they change once their transaction has committed.
+    That only reaches the process's own memory backend; use the sqlite
+    backend when several worker processes serve the app.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config['RESPONSE_CACHE_BACKEND']
+        if backend == 'memory':
+            self.backend = LRUCache(
+                app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+                app.config['RESPONSE_CACHE_MAX_BYTES'],
+                app.config['RESPONSE_CACHE_TTL']
+            )
+        elif backend == 'sqlite':
+            os.makedirs(app.instance_path, exist_ok=True)
+            self.backend = SQLiteCache(
+                os.path.join(app.instance_path, app.config['RESPONSE_CACHE_PATH']),
+                app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+                app.config['RESPONSE_CACHE_MAX_BYTES'],
+                app.config['RESPONSE_CACHE_TTL']
+            )
+        else:
+            self.backend = None
+        app.extensions['response_cache'] = self
+
+    def cached(self, namespace):
+        """Decorator caching successful responses of a view for the current user.
+
+        Must be applied below ``jwt_required``.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if self.backend is None:
+                    return f(*args, **kwargs)
+
+                user_id = int(get_jwt_identity())
+                key = (user_id, namespace, self._request_key(namespace, user_id))
+                cached = self.backend.get(key)
+                if cached is not None:
+                    body, status, mimetype, vary = cached
+                    response = make_response(body, status)
+                    response.mimetype = mimetype
+                    if vary:
+                        response.headers['Vary'] = vary
+                    return response
+
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self.backend.set(key, (
+                        response.get_data(), response.status_code, response.mimetype, response.headers.get('Vary')
+                    ))
+                return response
+
+            return decorated_function
+        return decorator
+
+    def invalidate_user(self, user_id, namespace):
+        """Drop every cached response built from a user's data in a namespace."""
+        if self.backend is not None:
+            self.backend.invalidate(user_id, namespace)
+
+    def stats(self):
+        if self.backend is None:
+            return {'backend': None}
+        return self.backend.stats()
+
+    @staticmethod
+    def _request_key(namespace, user_id):
+        """Normalize the request into a key: path, sorted arguments and Accept.
+
+        Keys in the versioned namespaces also carry the user's data version,
+        so a write made through another worker process changes the key even
+        though only that process's cache was invalidated.
+        """
+        args = urlencode(sorted(request.args.items(multi=True)))
+        key = f"{request.path}?{args}|{request.headers.get('Accept', '')}"
+        if namespace in VERSIONED_NAMESPACES:
+            key += f'|v{request_data_version(user_id)}'
+        return key
+
+response_cache = ResponseCache()
@@ -1,10 +1,16 @@
+import logging
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt
 from models import db, User
+from identity import identity_cache
+from hashing import password_hasher, HashingBusy
+from read_routing import read_replica
 from auth import validate_password, validate_email, validate_username, blacklist_token
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+logger = logging.getLogger(__name__)
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user."""
@@ -56,6 +62,9 @@ def register():
             'user_id': user.id
         }), 201
         
+    except HashingBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Too many requests, please retry shortly'}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Registration failed'}), 500
@@ -83,19 +92,21 @@ def login():
         if not user or not user.check_password(password):
             return jsonify({'error': 'Invalid credentials'}), 401
         
-        # Debug: Log user info
-        print(f"DEBUG: Login successful for user ID: {user.id}, username: {user.username}")
-        print(f"DEBUG: JWT_SECRET_KEY during token creation: {current_app.config.get('JWT_SECRET_KEY', 'NOT_SET')}")
+        # Upgrade hashes made with older parameters while the password is at hand
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+            identity_cache.invalidate(user.id)
+            password_hasher.count_rehash()
+        
+        logger.info('login succeeded', extra={'user_id': user.id})
         
         try:
             # Create JWT tokens
             access_token = create_access_token(identity=str(user.id))
             refresh_token = create_refresh_token(identity=str(user.id))
             
-            print(f"DEBUG: Generated token for user_id {user.id}: {access_token[:50]}...")
-            
             user_dict = user.to_dict()
-            print(f"DEBUG: User dict: {user_dict}")
             
             return jsonify({
                 'token': access_token,
@@ -103,15 +114,14 @@ def login():
                 'user_info': user_dict
             }), 200
         except Exception as e:
-            print(f"DEBUG: Exception during token creation or response: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('token creation failed', extra={'user_id': user.id})
             return jsonify({'error': 'Login failed'}), 500
         
+    except HashingBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Too many requests, please retry shortly'}), 503
     except Exception as e:
-        print(f"ERROR: Login exception: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('login failed')
         return jsonify({'error': 'Login failed'}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
@@ -119,8 +129,7 @@ def login():
 def logout():
     """Logout user and blacklist token."""
     try:
-        jti = get_jwt()['jti']
-        blacklist_token(jti)
+        blacklist_token(get_jwt())
         
         return jsonify({'message': 'Successfully logged out'}), 200
         
@@ -129,11 +138,11 @@ def logout():
 
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_current_user():
     """Get current user information."""
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        user = identity_cache.resolve(get_jwt_identity())
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -148,13 +157,12 @@ def get_current_user():
 def refresh():
     """Refresh JWT access token."""
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        user = identity_cache.resolve(get_jwt_identity())
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        new_access_token = create_access_token(identity=str(current_user_id))
+        new_access_token = create_access_token(identity=str(user.id))
         
         return jsonify({'token': new_access_token}), 200
         
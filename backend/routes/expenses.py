@@ -1,22 +1,86 @@
-from flask import Blueprint, request, jsonify, current_app
+import csv
+import io
+import json
+import logging
+import math
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, date
-from models import db, Expense, User
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from models import db, Expense, ExpenseRollup, User
 from auth import auth_required
-from sqlalchemy import and_, or_
+from pagination import encode_cursor, decode_cursor
+from etags import etag_by_data_version
+from response_cache import response_cache
+from write_coalescing import write_coalescer
+from read_routing import read_replica
+from serializers import (
+    expense_page_response, negotiate_format, offered_formats,
+    parse_fields, select_expense_columns, summary_response
+)
+from search import apply_search, relevance_order, search_terms
+from aggregates import (
+    SERIES_BUCKETS, bucket_column, bucket_start, next_bucket,
+    count_expenses, estimate_expense_count, insert_expenses, summarize_expenses
+)
+from validation import (
+    validate_amount, validate_category, validate_description,
+    validate_expense_date, validate_expense_data
+)
+from sqlalchemy import and_, or_, tuple_
 
 expenses_bp = Blueprint('expenses', __name__, url_prefix='/api/expenses')
 
+logger = logging.getLogger(__name__)
+
+TOTAL_MODES = ('none', 'exact', 'estimate')
+SORT_ORDERS = ('date', 'relevance')
+EMPTY_CELL = (0, 0)
+
+def apply_expense_filters(query, args):
+    """Apply the category/date_from/date_to/q filters shared by the list endpoints.
+
+    Returns a (query, error_message) tuple; error_message is None on success.
+    """
+    category = args.get('category')
+    date_from = args.get('date_from')
+    date_to = args.get('date_to')
+    
+    if category:
+        query = query.filter(Expense.category == category)
+    
+    if date_from:
+        try:
+            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
+            query = query.filter(Expense.date >= date_from_obj)
+        except ValueError:
+            return query, 'Invalid date_from format. Use YYYY-MM-DD'
+    
+    if date_to:
+        try:
+            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
+            query = query.filter(Expense.date <= date_to_obj)
+        except ValueError:
+            return query, 'Invalid date_to format. Use YYYY-MM-DD'
+    
+    if args.get('q'):
+        query = apply_search(query, args['q'])
+    
+    return query, None
+
 @expenses_bp.route('', methods=['GET'])
 @jwt_required()
+@read_replica
+@etag_by_data_version
+@response_cache.cached('expenses')
 def get_expenses():
     """Get user's expenses with optional filtering and pagination."""
     try:
         current_user_id_str = get_jwt_identity()
-        print(f"DEBUG: Expenses request - current_user_id from JWT: {current_user_id_str}")
         
         if current_user_id_str is None:
-            print("DEBUG: JWT identity is None - token might be invalid")
+            logger.debug('JWT identity is None - token might be invalid')
             return jsonify({'error': 'Invalid token - no user identity'}), 401
         
         # Convert string ID back to integer for database queries
@@ -25,58 +89,137 @@ def get_expenses():
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', current_app.config['EXPENSES_PER_PAGE'], type=int)
-        category = request.args.get('category')
-        date_from = request.args.get('date_from')
-        date_to = request.args.get('date_to')
+        cursor = request.args.get('cursor')
+        total_mode = request.args.get('total', 'exact')
+        sort = request.args.get('sort', 'date')
+        
+        if sort not in SORT_ORDERS:
+            return jsonify({'error': f'Invalid sort. Must be one of: {", ".join(SORT_ORDERS)}'}), 400
+        
+        fields, error = parse_fields(request.args.get('fields'))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        mimetype = negotiate_format()
+        if mimetype is None:
+            return jsonify({'error': f'Not acceptable. Available formats: {", ".join(offered_formats())}'}), 406
         
         # Build query
         query = Expense.query.filter_by(user_id=current_user_id)
         
         # Apply filters
-        if category:
-            query = query.filter(Expense.category == category)
+        query, error = apply_expense_filters(query, request.args)
+        if error:
+            return jsonify({'error': error}), 400
         
-        if date_from:
-            try:
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-                query = query.filter(Expense.date >= date_from_obj)
-            except ValueError:
-                return jsonify({'error': 'Invalid date_from format. Use YYYY-MM-DD'}), 400
+        if cursor is not None and sort == 'relevance':
+            return jsonify({'error': 'Relevance sort is not supported with cursor pagination'}), 400
         
-        if date_to:
-            try:
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-                query = query.filter(Expense.date <= date_to_obj)
-            except ValueError:
-                return jsonify({'error': 'Invalid date_to format. Use YYYY-MM-DD'}), 400
-        
-        # Order by date descending
-        query = query.order_by(Expense.date.desc(), Expense.created_at.desc())
-        
-        # Paginate
-        pagination = query.paginate(
-            page=page,
-            per_page=limit,
-            error_out=False
-        )
+        # Rank search results first when asked to and the search index can
+        rank = relevance_order() if sort == 'relevance' and search_terms(request.args.get('q')) else None
+        if rank is not None:
+            query = query.order_by(rank)
         
-        expenses = [expense.to_dict() for expense in pagination.items]
+        # Order by date descending; id breaks ties so the order is total
+        query = query.order_by(Expense.date.desc(), Expense.created_at.desc(), Expense.id.desc())
         
-        return jsonify({
-            'expenses': expenses,
-            'total': pagination.total,
+        if cursor is not None:
+            return _get_expenses_page_by_cursor(query, cursor, limit, fields, mimetype)
+        
+        if total_mode not in TOTAL_MODES:
+            return jsonify({'error': f'Invalid total. Must be one of: {", ".join(TOTAL_MODES)}'}), 400
+        
+        # Paginate, fetching one extra row to find out whether another page exists
+        if page < 1:
+            page = 1
+        if limit < 1:
+            limit = current_app.config['EXPENSES_PER_PAGE']
+        rows_query, columns = select_expense_columns(query, fields)
+        rows = rows_query.offset((page - 1) * limit).limit(limit + 1).all()
+        has_next = len(rows) > limit
+        
+        total = _count_filtered_expenses(query, current_user_id, total_mode)
+        
+        meta = {
+            'total': total,
             'page_info': {
                 'page': page,
-                'pages': pagination.pages,
+                'pages': math.ceil(total / limit) if total is not None else None,
                 'per_page': limit,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
+                'has_next': has_next,
+                'has_prev': page > 1
             }
-        }), 200
+        }
+        if total_mode == 'estimate':
+            meta['total_estimated'] = _needs_row_count(request.args)
+        
+        return expense_page_response(mimetype, rows[:limit], columns, fields, meta)
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve expenses'}), 500
 
+def _needs_row_count(args):
+    """Return True when filters other than category make the counters inexact."""
+    return bool(args.get('date_from') or args.get('date_to') or search_terms(args.get('q')))
+
+def _count_filtered_expenses(query, user_id, total_mode):
+    """Count the rows matched by a filtered list query.
+    
+    ``none`` skips counting. Without date or search filters both ``exact``
+    and ``estimate`` answer from the maintained counters. Otherwise
+    ``exact`` falls back to COUNT(*), while ``estimate`` sums the monthly
+    rollups the date range touches, an upper bound on the true count.
+    """
+    if total_mode == 'none':
+        return None
+    category = request.args.get('category')
+    if not _needs_row_count(request.args):
+        return count_expenses(user_id, category)
+    if total_mode == 'exact':
+        return query.order_by(None).count()
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+    return estimate_expense_count(
+        user_id,
+        category,
+        datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None,
+        datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None
+    )
+
+def _get_expenses_page_by_cursor(query, cursor, limit, fields, mimetype):
+    """Return one keyset page of an ordered expense query."""
+    if limit < 1:
+        return jsonify({'error': 'Limit must be at least 1'}), 400
+    
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(
+            tuple_(Expense.date, Expense.created_at, Expense.id) < tuple_(*position)
+        )
+    
+    # Fetch one extra row to find out whether another page exists
+    rows_query, columns = select_expense_columns(query, fields)
+    rows = rows_query.limit(limit + 1).all()
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    
+    next_cursor = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            last[columns.index('date')], last[columns.index('created_at')], last[columns.index('id')]
+        )
+    
+    return expense_page_response(mimetype, rows, columns, fields, {
+        'next_cursor': next_cursor,
+        'page_info': {
+            'per_page': limit,
+            'has_next': has_next
+        }
+    })
+
 @expenses_bp.route('', methods=['POST'])
 @jwt_required()
 def create_expense():
@@ -88,57 +231,82 @@ def create_expense():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Validate required fields
-        amount = data.get('amount')
-        description = data.get('description', '').strip()
-        category = data.get('category', '').strip()
-        expense_date = data.get('date')
-        
-        if not all([amount, description, category, expense_date]):
-            return jsonify({'error': 'Amount, description, category, and date are required'}), 400
-        
-        # Validate amount
-        try:
-            amount = float(amount)
-            if amount <= 0:
-                return jsonify({'error': 'Amount must be greater than 0'}), 400
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Invalid amount format'}), 400
+        values, error = validate_expense_data(data, current_app.config['EXPENSE_CATEGORIES'])
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Validate category
-        if category not in current_app.config['EXPENSE_CATEGORIES']:
-            return jsonify({'error': f'Invalid category. Must be one of: {", ".join(current_app.config["EXPENSE_CATEGORIES"])}'}), 400
+        # Create expense
+        def create(session):
+            expense = Expense(user_id=current_user_id, **values)
+            session.add(expense)
+            session.flush()
+            return expense.to_dict()
         
-        # Validate date
-        try:
-            expense_date_obj = datetime.strptime(expense_date, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        expense = write_coalescer.execute(create)
+        response_cache.invalidate_user(current_user_id, 'expenses')
         
-        # Validate description length
-        if len(description) > 255:
-            return jsonify({'error': 'Description must be less than 255 characters'}), 400
+        return jsonify({'expense': expense}), 201
         
-        # Create expense
-        expense = Expense(
-            user_id=current_user_id,
-            amount=amount,
-            description=description,
-            category=category,
-            date=expense_date_obj
-        )
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to create expense'}), 500
+
+@expenses_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def create_expenses_bulk():
+    """Create many expenses in one request.
+    
+    Expects ``{"expenses": [...]}`` with the same fields as a single create.
+    With ``atomic=true`` (the default) any invalid row rejects the whole
+    request; with ``atomic=false`` the valid rows are stored and the invalid
+    ones are reported. Valid rows are inserted in executemany batches inside a
+    single transaction.
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        data = request.get_json()
         
-        db.session.add(expense)
+        if not data or not isinstance(data.get('expenses'), list):
+            return jsonify({'error': 'A list of expenses is required'}), 400
+        
+        atomic = request.args.get('atomic', 'true').lower()
+        if atomic not in ('true', 'false'):
+            return jsonify({'error': 'Invalid atomic. Must be true or false'}), 400
+        atomic = atomic == 'true'
+        
+        items = data['expenses']
+        max_items = current_app.config['BULK_MAX_EXPENSES']
+        if len(items) > max_items:
+            return jsonify({'error': f'At most {max_items} expenses can be created at once'}), 400
+        
+        categories = current_app.config['EXPENSE_CATEGORIES']
+        rows = []
+        errors = []
+        for index, item in enumerate(items):
+            values, error = validate_expense_data(item, categories)
+            if error:
+                errors.append({'index': index, 'error': error})
+            else:
+                rows.append(dict(values, user_id=current_user_id))
+        
+        if errors and (atomic or not rows):
+            return jsonify({'error': 'Invalid expenses', 'created': 0, 'errors': errors}), 400
+        
+        insert_expenses(rows, current_app.config['BULK_INSERT_BATCH_SIZE'])
         db.session.commit()
+        response_cache.invalidate_user(current_user_id, 'expenses')
         
-        return jsonify({'expense': expense.to_dict()}), 201
+        return jsonify({'created': len(rows), 'errors': errors}), 201
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to create expense'}), 500
+        return jsonify({'error': 'Failed to create expenses'}), 500
 
 @expenses_bp.route('/<int:expense_id>', methods=['GET'])
 @jwt_required()
+@read_replica
+@etag_by_data_version
+@response_cache.cached('expenses')
 def get_expense(expense_id):
     """Get a specific expense."""
     try:
@@ -161,9 +329,7 @@ def update_expense(expense_id):
     try:
         current_user_id = int(get_jwt_identity())
         
-        expense = Expense.query.filter_by(id=expense_id, user_id=current_user_id).first()
-        
-        if not expense:
+        if not db.session.query(Expense.id).filter_by(id=expense_id, user_id=current_user_id).first():
             return jsonify({'error': 'Expense not found'}), 404
         
         data = request.get_json()
@@ -171,39 +337,46 @@ def update_expense(expense_id):
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Update fields if provided
+        # Validate fields if provided
+        changes = {}
         if 'amount' in data:
-            try:
-                amount = float(data['amount'])
-                if amount <= 0:
-                    return jsonify({'error': 'Amount must be greater than 0'}), 400
-                expense.amount = amount
-            except (ValueError, TypeError):
-                return jsonify({'error': 'Invalid amount format'}), 400
+            changes['amount'], error = validate_amount(data['amount'])
+            if error:
+                return jsonify({'error': error}), 400
         
         if 'description' in data:
-            description = data['description'].strip()
-            if len(description) > 255:
-                return jsonify({'error': 'Description must be less than 255 characters'}), 400
-            expense.description = description
+            changes['description'], error = validate_description(data['description'])
+            if error:
+                return jsonify({'error': error}), 400
         
         if 'category' in data:
-            category = data['category'].strip()
-            if category not in current_app.config['EXPENSE_CATEGORIES']:
-                return jsonify({'error': f'Invalid category. Must be one of: {", ".join(current_app.config["EXPENSE_CATEGORIES"])}'}), 400
-            expense.category = category
+            changes['category'], error = validate_category(data['category'], current_app.config['EXPENSE_CATEGORIES'])
+            if error:
+                return jsonify({'error': error}), 400
         
         if 'date' in data:
-            try:
-                expense_date_obj = datetime.strptime(data['date'], '%Y-%m-%d').date()
-                expense.date = expense_date_obj
-            except ValueError:
-                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+            changes['date'], error = validate_expense_date(data['date'])
+            if error:
+                return jsonify({'error': error}), 400
+        
+        def update(session):
+            expense = session.query(Expense).filter_by(id=expense_id, user_id=current_user_id).first()
+            if not expense:
+                return None  # deleted since the check above
+            for name, value in changes.items():
+                setattr(expense, name, value)
+            expense.updated_at = datetime.utcnow()
+            session.flush()
+            return expense.to_dict()
+        
+        expense = write_coalescer.execute(update)
         
-        expense.updated_at = datetime.utcnow()
-        db.session.commit()
+        if not expense:
+            return jsonify({'error': 'Expense not found'}), 404
         
-        return jsonify({'expense': expense.to_dict()}), 200
+        response_cache.invalidate_user(current_user_id, 'expenses')
+        
+        return jsonify({'expense': expense}), 200
         
     except Exception as e:
         db.session.rollback()
@@ -216,13 +389,18 @@ def delete_expense(expense_id):
     try:
         current_user_id = int(get_jwt_identity())
         
-        expense = Expense.query.filter_by(id=expense_id, user_id=current_user_id).first()
+        def delete(session):
+            expense = session.query(Expense).filter_by(id=expense_id, user_id=current_user_id).first()
+            if not expense:
+                return False
+            session.delete(expense)
+            session.flush()
+            return True
         
-        if not expense:
+        if not write_coalescer.execute(delete):
             return jsonify({'error': 'Expense not found'}), 404
         
-        db.session.delete(expense)
-        db.session.commit()
+        response_cache.invalidate_user(current_user_id, 'expenses')
         
         return jsonify({'message': 'Expense deleted successfully'}), 200
         
@@ -230,6 +408,217 @@ def delete_expense(expense_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to delete expense'}), 500
 
+EXPORT_COLUMNS = ('id', 'date', 'category', 'description', 'amount', 'created_at', 'updated_at')
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+@expenses_bp.route('/export', methods=['GET'])
+@jwt_required()
+@read_replica
+def export_expenses():
+    """Stream all of the user's expenses as CSV or NDJSON.
+    
+    Rows are read from a server-side cursor in batches and written to the
+    response as they arrive, so memory use does not grow with the account.
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        export_format = request.args.get('format', 'csv')
+        
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'Invalid format. Must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+        
+        query = db.select(*[getattr(Expense, column) for column in EXPORT_COLUMNS]).where(
+            Expense.user_id == current_user_id
+        )
+        query, error = apply_expense_filters(query, request.args)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        query = query.order_by(Expense.date.desc(), Expense.created_at.desc(), Expense.id.desc())
+        query = query.execution_options(yield_per=current_app.config['EXPORT_BATCH_SIZE'])
+        
+        if export_format == 'csv':
+            rows = _export_csv(db.session.execute(query))
+        else:
+            rows = _export_ndjson(db.session.execute(query), current_user_id)
+        
+        response = Response(stream_with_context(rows), mimetype=EXPORT_FORMATS[export_format])
+        response.headers['Content-Disposition'] = f'attachment; filename=expenses.{export_format}'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to export expenses'}), 500
+
+def _export_csv(result):
+    """Yield CSV text for an export result, one chunk per fetched batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in result.partitions():
+        for expense_id, expense_date, category, description, amount, created_at, updated_at in batch:
+            writer.writerow((
+                expense_id,
+                expense_date.isoformat(),
+                category,
+                description,
+                amount,
+                created_at.isoformat() if created_at else '',
+                updated_at.isoformat() if updated_at else ''
+            ))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _export_ndjson(result, user_id):
+    """Yield one JSON document per expense, in the same shape as to_dict()."""
+    for batch in result.partitions():
+        yield ''.join(
+            json.dumps({
+                'id': expense_id,
+                'user_id': user_id,
+                'amount': float(amount),
+                'description': description,
+                'category': category,
+                'date': expense_date.isoformat(),
+                'created_at': created_at.isoformat() if created_at else None,
+                'updated_at': updated_at.isoformat() if updated_at else None
+            }) + '\n'
+            for expense_id, expense_date, category, description, amount, created_at, updated_at in batch
+        )
+
+@expenses_bp.route('/series', methods=['GET'])
+@jwt_required()
+@read_replica
+@etag_by_data_version
+@response_cache.cached('expenses')
+def get_expense_series():
+    """Get a zero-filled time series of expense totals and counts per category.
+    
+    Buckets are ``day``, ``week`` (starting Monday) or ``month``. The series
+    is computed with one grouped query; month buckets whose range falls on
+    month boundaries are answered from the maintained rollups.
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        bucket = request.args.get('bucket', 'month')
+        category = request.args.get('category')
+        
+        if bucket not in SERIES_BUCKETS:
+            return jsonify({'error': f'Invalid bucket. Must be one of: {", ".join(SERIES_BUCKETS)}'}), 400
+        
+        date_from = date_to = None
+        try:
+            if request.args.get('date_from'):
+                date_from = datetime.strptime(request.args['date_from'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date_from format. Use YYYY-MM-DD'}), 400
+        try:
+            if request.args.get('date_to'):
+                date_to = datetime.strptime(request.args['date_to'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date_to format. Use YYYY-MM-DD'}), 400
+        
+        max_buckets = current_app.config['SERIES_MAX_BUCKETS']
+        if date_from and date_to and _bucket_span(date_from, date_to, bucket) > max_buckets:
+            return jsonify({'error': f'Range spans more than {max_buckets} buckets'}), 400
+        
+        # Sum the rows of the grouped query into {(bucket, category): [total, count]}
+        cells = defaultdict(lambda: [Decimal('0'), 0])
+        for bucket_value, row_category, total, count in _query_series(
+                current_user_id, bucket, category, date_from, date_to):
+            cell = cells[(bucket_start(bucket_value, bucket), row_category)]
+            cell[0] += Decimal(str(total))
+            cell[1] += count
+        
+        if not cells and not (date_from and date_to):
+            return jsonify({'bucket': bucket, 'buckets': [], 'series': []}), 200
+        
+        first = bucket_start(date_from or min(key[0] for key in cells), bucket)
+        last = bucket_start(date_to or max(key[0] for key in cells), bucket)
+        if _bucket_span(first, last, bucket) > max_buckets:
+            return jsonify({'error': f'Range spans more than {max_buckets} buckets'}), 400
+        
+        buckets = []
+        current = first
+        while current <= last:
+            buckets.append(current)
+            current = next_bucket(current, bucket)
+        
+        categories = sorted({key[1] for key in cells} | ({category} if category else set()))
+        
+        return jsonify({
+            'bucket': bucket,
+            'buckets': [start.isoformat() for start in buckets],
+            'series': [
+                {
+                    'category': series_category,
+                    'totals': [round(float(cells.get((start, series_category), EMPTY_CELL)[0]), 2) for start in buckets],
+                    'counts': [cells.get((start, series_category), EMPTY_CELL)[1] for start in buckets]
+                }
+                for series_category in categories
+            ]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to retrieve expense series'}), 500
+
+def _bucket_span(first, last, bucket):
+    """Return roughly how many buckets lie between two dates."""
+    days = (last - first).days
+    if bucket == 'month':
+        return days // 28 + 1
+    if bucket == 'week':
+        return days // 7 + 1
+    return days + 1
+
+def _query_series(user_id, bucket, category, date_from, date_to):
+    """Run the single grouped query behind the series endpoint.
+    
+    Yields (bucket, category, total, count) rows. The bucket is already the
+    bucket start when the database can compute it, otherwise it is the
+    expense date and the caller folds it.
+    """
+    month_aligned = (
+        (date_from is None or date_from.day == 1) and
+        (date_to is None or (date_to + timedelta(days=1)).day == 1)
+    )
+    if bucket == 'month' and month_aligned:
+        query = db.session.query(
+            ExpenseRollup.month,
+            ExpenseRollup.category,
+            db.func.sum(ExpenseRollup.total),
+            db.func.sum(ExpenseRollup.count)
+        ).filter(ExpenseRollup.user_id == user_id, ExpenseRollup.count > 0)
+        if category:
+            query = query.filter(ExpenseRollup.category == category)
+        if date_from:
+            query = query.filter(ExpenseRollup.month >= date_from)
+        if date_to:
+            query = query.filter(ExpenseRollup.month <= date_to)
+        return query.group_by(ExpenseRollup.month, ExpenseRollup.category).all()
+    
+    column = bucket_column(bucket, db.session.get_bind().dialect.name)
+    if column is None:
+        column = Expense.date
+    query = db.session.query(
+        column,
+        Expense.category,
+        db.func.sum(Expense.amount),
+        db.func.count(Expense.id)
+    ).filter(Expense.user_id == user_id)
+    if category:
+        query = query.filter(Expense.category == category)
+    if date_from:
+        query = query.filter(Expense.date >= date_from)
+    if date_to:
+        query = query.filter(Expense.date <= date_to)
+    return query.group_by(column, Expense.category).all()
+
 @expenses_bp.route('/categories', methods=['GET'])
 def get_categories():
     """Get available expense categories."""
@@ -240,36 +629,24 @@ def get_categories():
 
 @expenses_bp.route('/summary', methods=['GET'])
 @jwt_required()
+@read_replica
+@etag_by_data_version
+@response_cache.cached('expenses')
 def get_expense_summary():
     """Get expense summary for the current user."""
     try:
         current_user_id = int(get_jwt_identity())
         
-        # Get total expenses
-        total_expenses = db.session.query(db.func.sum(Expense.amount)).filter_by(user_id=current_user_id).scalar() or 0
+        mimetype = negotiate_format()
+        if mimetype is None:
+            return jsonify({'error': f'Not acceptable. Available formats: {", ".join(offered_formats())}'}), 406
         
-        # Get expenses by category
-        category_summary = db.session.query(
-            Expense.category,
-            db.func.sum(Expense.amount).label('total'),
-            db.func.count(Expense.id).label('count')
-        ).filter_by(user_id=current_user_id).group_by(Expense.category).all()
+        # Aggregate the maintained monthly rollups rather than the expenses
+        category_summary = summarize_expenses(current_user_id)
+        total_expenses = sum(cat.total for cat in category_summary)
+        recent_count = sum(cat.count for cat in category_summary)
         
-        # Get recent expenses count
-        recent_count = Expense.query.filter_by(user_id=current_user_id).count()
-        
-        return jsonify({
-            'total_amount': float(total_expenses),
-            'total_count': recent_count,
-            'categories': [
-                {
-                    'category': cat.category,
-                    'total': float(cat.total),
-                    'count': cat.count
-                }
-                for cat in category_summary
-            ]
-        }), 200
+        return summary_response(mimetype, category_summary, total_expenses, recent_count)
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve expense summary'}), 500
\ No newline at end of file
@@ -0,0 +1,93 @@
+import io
+import json
+import logging
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db
+from importers import IMPORT_FORMATS, ExpenseImporter, parse_csv, parse_ofx, parse_qif
+
+imports_bp = Blueprint('imports', __name__, url_prefix='/api/imports')
+
+logger = logging.getLogger(__name__)
+
+@imports_bp.route('', methods=['POST'])
+@jwt_required()
+def import_statement():
+    """Import expenses from an uploaded bank statement file.
+    
+    Expects a multipart upload with the statement in ``file``. The format is
+    taken from ``format`` or the file extension. CSV uploads can name their
+    columns with ``date_column``, ``amount_column``, ``description_column``
+    and ``category_column``. Debits become expenses; credits are skipped.
+    
+    With ``progress=stream`` the response is NDJSON with one progress report
+    per committed chunk; otherwise only the final report is returned.
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        upload = request.files.get('file')
+        
+        if not upload or not upload.filename:
+            return jsonify({'error': 'A statement file is required'}), 400
+        
+        import_format = (request.form.get('format') or upload.filename.rsplit('.', 1)[-1]).lower()
+        if import_format not in IMPORT_FORMATS:
+            return jsonify({'error': f'Invalid format. Must be one of: {", ".join(IMPORT_FORMATS)}'}), 400
+        
+        categories = current_app.config['EXPENSE_CATEGORIES']
+        default_category = request.form.get('default_category', 'Other')
+        if default_category not in categories:
+            return jsonify({'error': f'Invalid category. Must be one of: {", ".join(categories)}'}), 400
+        
+        text_stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', errors='replace', newline='')
+        records = _parse_statement(import_format, text_stream, request.form)
+        
+        importer = ExpenseImporter(
+            current_user_id,
+            categories,
+            current_app.config['IMPORT_CHUNK_SIZE'],
+            default_category=default_category
+        )
+        
+        if request.args.get('progress') == 'stream':
+            return Response(stream_with_context(_stream_reports(importer, records)), mimetype='application/x-ndjson')
+        
+        for report in importer.run(records):
+            pass
+        
+        return jsonify(report), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import statement'}), 500
+
+def _stream_reports(importer, records):
+    """Yield the importer's reports as NDJSON lines.
+    
+    The status line has already been sent, so a failure is reported as a
+    final line with an ``error`` and the counts committed until then.
+    """
+    report = {}
+    try:
+        for report in importer.run(records):
+            yield json.dumps(report) + '\n'
+    except Exception:
+        db.session.rollback()
+        logger.exception('statement import failed')
+        yield json.dumps(dict(report, error='Failed to import statement', done=True)) + '\n'
+
+def _parse_statement(import_format, text_stream, options):
+    """Return a record generator for the given statement format."""
+    if import_format == 'ofx':
+        return parse_ofx(text_stream)
+    if import_format == 'qif':
+        return parse_qif(text_stream, date_format=options.get('date_format', '%m/%d/%Y'))
+    return parse_csv(
+        text_stream,
+        date_column=options.get('date_column', 'date'),
+        amount_column=options.get('amount_column', 'amount'),
+        description_column=options.get('description_column', 'description'),
+        category_column=options.get('category_column', 'category'),
+        date_format=options.get('date_format', '%Y-%m-%d'),
+        invert_amounts=options.get('invert_amounts', 'false').lower() == 'true'
+    )
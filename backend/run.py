@@ -3,39 +3,52 @@
 Expense Tracker Backend Application Runner
 
 This script runs the Flask application for the Expense Tracker backend.
-It handles database initialization and starts the development server.
+It handles database initialization and starts either the development
+server or a production pre-forking server.
+
+Usage:
+    python run.py                 # development server with the reloader
+    python run.py serve [--workers N] [--threads M] [--bind HOST:PORT]
 """
 
+import argparse
 import os
 from app import create_app, db
+from hashing import password_hasher
+from response_cache import response_cache
 
-def main():
-    """Main function to run the application."""
-    # Load environment variables
-    from dotenv import load_dotenv
-    load_dotenv()
-    
-    # Create the Flask app
-    app = create_app()
-    
-    # Initialize database
+def default_workers():
+    """Gunicorn's recommended worker count for the machine: 2 * CPUs + 1."""
+    return (os.cpu_count() or 1) * 2 + 1
+
+def init_database(app):
+    """Create any missing tables; returns False if the database is unusable."""
     with app.app_context():
         try:
             db.create_all()
             print("✅ Database initialized successfully!")
         except Exception as e:
             print(f"❌ Database initialization failed: {e}")
-            return
-    
-    # Debug CORS configuration
-    print("🌐 CORS Configuration: Allowing ALL origins (*)")
-    print("⚠️  Warning: This is for development/testing only!")
-    print("🔓 All cross-origin requests will be accepted")
-    
+            return False
+    return True
+
+def run_dev_server():
+    """Run the Werkzeug development server. Not for production use."""
+    # Create the Flask app
+    app = create_app()
+
+    # Initialize database
+    if not init_database(app):
+        return
+
+    # CORS configuration
+    print(f"🌐 CORS origins: {', '.join(app.config['CORS_ORIGINS'])}")
+
     # Start the development server
+    port = int(os.environ.get('PORT', 5000))
     print("🚀 Starting Expense Tracker Backend...")
-    print("📍 Server running at: http://localhost:5000")
-    print("📋 API Documentation available at: http://localhost:5000")
+    print(f"📍 Server running at: http://localhost:{port}")
+    print(f"📋 API Documentation available at: http://localhost:{port}")
     print("🔧 Environment: development")
     print("💾 Database: SQLite (expense_tracker.db)")
     print("\n📖 Available endpoints:")
@@ -51,12 +64,99 @@ def main():
     print("   - GET  /api/expenses/categories - Get categories")
     print("   - GET  /api/user/profile - Get user profile")
     print("   - PUT  /api/user/profile - Update user profile")
+    print("   - Run `python run.py serve` for production serving")
     print("\n🛑 Press Ctrl+C to stop the server")
-    
+
     try:
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        app.run(debug=True, host='0.0.0.0', port=port)
     except KeyboardInterrupt:
         print("\n👋 Server stopped!")
 
+def serve(args):
+    """Serve the app through gunicorn's pre-forking server."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ gunicorn is not installed: pip install -r requirements.txt")
+        return
+
+    app = create_app(args.config)
+    if not init_database(app):
+        return
+    
+    # Share the CPUs for password hashing out across the web workers
+    app.config['WEB_CONCURRENCY'] = args.workers
+    password_hasher.init_app(app)
+    
+    if args.workers > 1 and app.config['RESPONSE_CACHE_BACKEND'] == 'memory':
+        # Invalidation would only reach the worker that handled the write
+        print("⚠️  The memory response cache is per process; disabled with several workers (use 'sqlite')")
+        app.config['RESPONSE_CACHE_BACKEND'] = 'none'
+        response_cache.init_app(app)
+
+    def post_fork(server, worker):
+        # Connections opened in the master must not be shared with workers
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': args.bind,
+                'workers': args.workers,
+                'threads': args.threads,
+                'worker_class': 'gthread' if args.threads > 1 else 'sync',
+                'preload_app': True,
+                'max_requests': args.max_requests,
+                'max_requests_jitter': args.max_requests // 10,
+                'timeout': args.timeout,
+                'graceful_timeout': args.graceful_timeout,
+                'keepalive': 5,
+                'accesslog': '-' if args.access_log else None,
+                'post_fork': post_fork
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    print(f"🚀 Serving '{args.config}' on {args.bind} with {args.workers} workers x {args.threads} threads")
+    ProductionServer().run()
+
+def build_parser():
+    """Command line arguments for the dev server and the serve command."""
+    parser = argparse.ArgumentParser(description='Run the Expense Tracker backend.')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('dev', help='development server with the reloader (default)')
+    serve_parser = commands.add_parser('serve', help='production pre-forking server (gunicorn)')
+    serve_parser.add_argument('--config', default='production', help='configuration name (default: production)')
+    serve_parser.add_argument('--bind', default=f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+    serve_parser.add_argument('--workers', type=int, default=default_workers(),
+                              help='worker processes (default: 2 * CPUs + 1)')
+    serve_parser.add_argument('--threads', type=int, default=1,
+                              help='threads per worker; more than 1 uses the gthread worker')
+    serve_parser.add_argument('--max-requests', type=int, default=1000,
+                              help='recycle a worker after this many requests, with 10%% jitter (0 disables)')
+    serve_parser.add_argument('--timeout', type=int, default=30, help='seconds before a silent worker is restarted')
+    serve_parser.add_argument('--graceful-timeout', type=int, default=30,
+                              help='seconds workers get to finish requests on restart or shutdown')
+    serve_parser.add_argument('--access-log', action='store_true', help='write an access log to stdout')
+    return parser
+
+def main():
+    """Main function to run the application."""
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    args = build_parser().parse_args()
+
+    if args.command == 'serve':
+        serve(args)
+    else:
+        run_dev_server()
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,101 @@
+import re
+from sqlalchemy import event, exc, table, column, text
+from models import db, Expense
+
+# External-content FTS5 index over expense descriptions. Triggers keep it in
+# sync with every insert, update and delete, including bulk inserts.
+SEARCH_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5("
+    "description, content='expenses', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses BEGIN "
+    "INSERT INTO expenses_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_delete AFTER DELETE ON expenses BEGIN "
+    "INSERT INTO expenses_fts(expenses_fts, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_update AFTER UPDATE OF description ON expenses BEGIN "
+    "INSERT INTO expenses_fts(expenses_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO expenses_fts(rowid, description) VALUES (new.id, new.description); END",
+)
+
+expenses_fts = table('expenses_fts', column('rowid'), column('description'), column('rank'))
+
+SEARCH_TERM = re.compile(r'\w+', re.UNICODE)
+
+# Whether each database (by URL) has the FTS5 index
+_index_available = {}
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    """Create the search index alongside the tables on SQLite."""
+    ensure_search_index(connection)
+
+def ensure_search_index(connection):
+    """Create the FTS5 index and its triggers if they are missing.
+
+    A newly created index is populated from the existing expenses. Returns
+    False when the database is not SQLite or lacks FTS5, in which case
+    searches fall back to LIKE matching.
+    """
+    if connection.dialect.name != 'sqlite':
+        return False
+
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expenses_fts'")
+    ).first() is not None
+    try:
+        for statement in SEARCH_INDEX_DDL:
+            connection.execute(text(statement))
+    except exc.OperationalError:
+        _index_available[str(connection.engine.url)] = False
+        return False
+
+    if not exists:
+        rebuild_search_index(connection)
+    _index_available[str(connection.engine.url)] = True
+    return True
+
+def rebuild_search_index(connection):
+    """Repopulate the FTS5 index from the expenses table."""
+    connection.execute(text("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')"))
+
+def search_index_available():
+    """Return True when the current database has the FTS5 index."""
+    engine = db.session.get_bind()
+    url = str(engine.url)
+    if url not in _index_available:
+        _index_available[url] = engine.dialect.name == 'sqlite' and db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expenses_fts'")
+        ).first() is not None
+    return _index_available[url]
+
+def search_terms(q):
+    """Split a search string into words."""
+    return SEARCH_TERM.findall(q or '')
+
+def apply_search(query, q):
+    """Restrict an expense query (ORM query or select) to descriptions matching q.
+
+    Every word must match, as a prefix, somewhere in the description.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return query
+
+    if search_index_available():
+        match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        return query.join(expenses_fts, expenses_fts.c.rowid == Expense.id).filter(
+            expenses_fts.c.description.match(match)
+        )
+
+    for term in terms:
+        pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        query = query.filter(Expense.description.ilike(pattern, escape='\\'))
+    return query
+
+def relevance_order():
+    """Return the ORDER BY clause ranking searched expenses, or None without the index.
+
+    Only valid on a query that apply_search has restricted.
+    """
+    if search_index_available():
+        return expenses_fts.c.rank
+    return None
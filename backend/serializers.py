@@ -0,0 +1,206 @@
+import json
+from decimal import Decimal
+from flask import Response, request
+from models import Expense
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional; MessagePack is not offered without it
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional; Arrow is not offered without it
+    pyarrow = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# Fields of Expense.to_dict(), in order
+EXPENSE_FIELDS = ('id', 'user_id', 'amount', 'description', 'category', 'date', 'created_at', 'updated_at')
+
+# Fields the list endpoint always needs to build pagination cursors
+KEY_FIELDS = ('date', 'created_at', 'id')
+
+DATE_FIELDS = ('date', 'created_at', 'updated_at')
+
+CENTS = Decimal('0.01')
+
+def parse_fields(value):
+    """Parse a sparse fieldset such as 'id,amount,date'.
+
+    Returns a (fields, error_message) tuple; no value selects every field.
+    """
+    if not value:
+        return EXPENSE_FIELDS, None
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in EXPENSE_FIELDS]
+    if unknown or not fields:
+        return None, f'Invalid fields. Must be among: {", ".join(EXPENSE_FIELDS)}'
+    return fields, None
+
+def select_expense_columns(query, fields):
+    """Switch an Expense query to plain column tuples.
+
+    Returns the query and the selected column names: the requested fields
+    followed by any key fields needed for cursors.
+    """
+    columns = fields + tuple(field for field in KEY_FIELDS if field not in fields)
+    return query.with_entities(*[getattr(Expense, column) for column in columns]), columns
+
+def expense_rows_to_dicts(rows, columns, fields):
+    """Convert column tuples into the same dictionaries Expense.to_dict() builds."""
+    plan = []
+    for field in fields:
+        if field == 'amount':
+            convert = float
+        elif field in DATE_FIELDS and orjson is None:
+            convert = _isoformat
+        else:
+            convert = None
+        plan.append((field, columns.index(field), convert))
+
+    return [
+        {field: convert(row[index]) if convert else row[index] for field, index, convert in plan}
+        for row in rows
+    ]
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def dumps(payload):
+    """Encode a payload as compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+def json_response(payload, status=200):
+    """Build a JSON response without going through jsonify."""
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+def offered_formats():
+    """Return the response mimetypes this installation can produce."""
+    formats = [JSON_MIMETYPE]
+    if msgpack is not None:
+        formats.append(MSGPACK_MIMETYPE)
+    if pyarrow is not None:
+        formats.append(ARROW_MIMETYPE)
+    return formats
+
+def negotiate_format():
+    """Pick the response mimetype from the Accept header.
+
+    Requests without an Accept header get JSON. Returns None when nothing
+    acceptable can be produced.
+    """
+    if not request.accept_mimetypes:
+        return JSON_MIMETYPE
+    return request.accept_mimetypes.best_match(offered_formats())
+
+def _binary_response(body, mimetype):
+    return _with_vary(Response(body, mimetype=mimetype))
+
+def expense_page_response(mimetype, rows, columns, fields, meta):
+    """Render a page of expense column tuples in the negotiated format.
+
+    JSON keeps the to_dict() shape. MessagePack sends the field names once
+    followed by one array per row, with amounts as exact decimal strings.
+    Arrow sends a columnar record batch with amounts as decimal128(10, 2)
+    and the pagination metadata in the schema metadata.
+    """
+    if mimetype == MSGPACK_MIMETYPE:
+        plan = [(columns.index(field), _msgpack_converter(field)) for field in fields]
+        payload = dict(meta, fields=list(fields), rows=[
+            [convert(row[index]) if convert else row[index] for index, convert in plan]
+            for row in rows
+        ])
+        return _binary_response(msgpack.packb(payload), mimetype)
+
+    if mimetype == ARROW_MIMETYPE:
+        arrays = [
+            pyarrow.array([row[columns.index(field)] for row in rows], type=ARROW_EXPENSE_TYPES[field])
+            for field in fields
+        ]
+        return _binary_response(_arrow_stream(arrays, list(fields), meta), mimetype)
+
+    return _with_vary(json_response(dict(meta, expenses=expense_rows_to_dicts(rows, columns, fields))))
+
+def summary_response(mimetype, categories, total_amount, total_count):
+    """Render the expense summary in the negotiated format.
+
+    ``categories`` holds (category, total, count) rows with Decimal totals.
+    """
+    total_amount = Decimal(total_amount).quantize(CENTS)
+    categories = [(category, Decimal(total).quantize(CENTS), count) for category, total, count in categories]
+    
+    if mimetype == MSGPACK_MIMETYPE:
+        return _binary_response(msgpack.packb({
+            'total_amount': str(total_amount),
+            'total_count': total_count,
+            'categories': [
+                {'category': category, 'total': str(total), 'count': count}
+                for category, total, count in categories
+            ]
+        }), mimetype)
+
+    if mimetype == ARROW_MIMETYPE:
+        arrays = [
+            pyarrow.array([row[0] for row in categories], type=pyarrow.string()),
+            pyarrow.array([row[1] for row in categories], type=pyarrow.decimal128(14, 2)),
+            pyarrow.array([row[2] for row in categories], type=pyarrow.int64())
+        ]
+        meta = {'total_amount': str(total_amount), 'total_count': total_count}
+        return _binary_response(_arrow_stream(arrays, ['category', 'total', 'count'], meta), mimetype)
+
+    return _with_vary(json_response({
+        'total_amount': round(float(total_amount), 2),
+        'total_count': total_count,
+        'categories': [
+            {'category': category, 'total': round(float(total), 2), 'count': count}
+            for category, total, count in categories
+        ]
+    }))
+
+def _with_vary(response):
+    response.vary.add('Accept')
+    return response
+
+def _msgpack_converter(field):
+    if field == 'amount':
+        return str
+    if field in DATE_FIELDS:
+        return _isoformat
+    return None
+
+def _arrow_stream(arrays, names, meta):
+    """Serialize columns as an Arrow IPC stream with JSON metadata."""
+    batch = pyarrow.RecordBatch.from_arrays(arrays, names=names)
+    schema = batch.schema.with_metadata({'meta': dumps(meta)})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+    return sink.getvalue().to_pybytes()
+
+if pyarrow is not None:
+    ARROW_EXPENSE_TYPES = {
+        'id': pyarrow.int64(),
+        'user_id': pyarrow.int64(),
+        'amount': pyarrow.decimal128(10, 2),
+        'description': pyarrow.string(),
+        'category': pyarrow.string(),
+        'date': pyarrow.date32(),
+        'created_at': pyarrow.timestamp('us'),
+        'updated_at': pyarrow.timestamp('us')
+    }
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+class SQLDiagnostics:
+    """Opt-in slow-query log and N+1 detector for the ``models.db`` engine.
+
+    Statements slower than ``SQL_SLOW_QUERY_THRESHOLD`` seconds are logged
+    with their query plan (bound parameters are not logged, since they
+    include credentials). Requests that run the same parameterized
+    statement more than ``SQL_N_PLUS_ONE_THRESHOLD`` times are logged as
+    likely N+1 patterns. Both cost a dictionary update per statement, so
+    this is meant for development and staging.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.counters = {'slow_queries': 0, 'n_plus_one_requests': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['sql_diagnostics'] = self
+        self.enabled = app.config['SQL_DIAGNOSTICS_ENABLED']
+        if not self.enabled:
+            return
+
+        self.slow_threshold = app.config['SQL_SLOW_QUERY_THRESHOLD']
+        self.explain = app.config['SQL_EXPLAIN_SLOW_QUERIES']
+        self.repeat_threshold = app.config['SQL_N_PLUS_ONE_THRESHOLD']
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        with app.app_context():
+            for engine in db.engines.values():
+                self.instrument_engine(engine)
+
+    def instrument_engine(self, engine):
+        if event.contains(engine, 'after_cursor_execute', self._after_cursor_execute):
+            return
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._diagnostics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_diagnostics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+
+        if has_request_context() and 'sql_statements' in g:
+            g.sql_statements[statement] += 1
+
+        if elapsed >= self.slow_threshold:
+            self._count('slow_queries')
+            plan = None
+            if self.explain and not executemany:
+                plan = explain(cursor, conn.dialect.name, statement, parameters)
+            logger.warning('slow query', extra={
+                'duration_ms': round(elapsed * 1000, 2),
+                'statement': statement,
+                'plan': plan,
+                'endpoint': request.endpoint if has_request_context() else None
+            })
+
+    def _start_request(self):
+        g.sql_statements = Counter()
+
+    def _finish_request(self, response):
+        statements = g.pop('sql_statements', None)
+        if not statements:
+            return response
+        repeated = {statement: count for statement, count in statements.items() if count > self.repeat_threshold}
+        if repeated:
+            self._count('n_plus_one_requests')
+            for statement, count in repeated.items():
+                logger.warning('repeated query, possible N+1', extra={
+                    'endpoint': request.endpoint,
+                    'count': count,
+                    'statement': statement
+                })
+        return response
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, enabled=self.enabled)
+
+sql_diagnostics = SQLDiagnostics()
+
+def explain(cursor, dialect_name, statement, parameters):
+    """Return the query plan of a statement as a list of rows, or None if it cannot be explained.
+
+    Runs on a fresh DBAPI cursor of the same connection, so it sees the same
+    transaction and does not trigger engine events.
+    """
+    if not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect_name == 'sqlite' else 'EXPLAIN '
+    try:
+        explain_cursor = cursor.connection.cursor()
+        try:
+            explain_cursor.execute(prefix + statement, parameters)
+            return [list(row) for row in explain_cursor.fetchall()]
+        finally:
+            explain_cursor.close()
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+
+@contextmanager
+def query_budget(max_queries, engine=None):
+    """Fail with AssertionError if the block runs more than ``max_queries`` statements.
+
+    For tests, inside an application context::
+
+        with query_budget(3):
+            client.get('/api/expenses', headers=headers)
+
+    Yields the list of statements run so far.
+    """
+    engine = engine or db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'after_cursor_execute', record)
+
+    if len(statements) > max_queries:
+        raise AssertionError(
+            f'{len(statements)} queries run, budget was {max_queries}:\n' + '\n'.join(statements)
+        )
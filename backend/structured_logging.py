@@ -0,0 +1,101 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Human-readable format for development, with ``extra`` fields as key=value pairs."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = ' '.join(f'{key}={value}' for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        return f'{line} {fields}' if fields else line
+
+class DebugSampler(logging.Filter):
+    """Let through only a fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+def init_logging(app):
+    """Route all logging through a queue drained by a background thread.
+
+    Request threads only enqueue records; formatting and writing to stderr
+    happen on the listener thread. Levels come from ``LOG_LEVELS`` (logger
+    name to level, '' for the root logger). When ``LOG_DEBUG_ENABLED`` is
+    false, DEBUG records are disabled process-wide.
+    """
+    global _listener, _queue_handler
+
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JSONFormatter() if app.config['LOG_FORMAT'] == 'json' else TextFormatter())
+
+    root = logging.getLogger()
+    if _listener is not None:
+        _listener.stop()
+        root.removeHandler(_queue_handler)
+
+    _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    _queue_handler.addFilter(DebugSampler(app.config['LOG_DEBUG_SAMPLE_RATE']))
+    root.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+
+    debug_enabled = app.config['LOG_DEBUG_ENABLED']
+    logging.disable(logging.NOTSET if debug_enabled else logging.DEBUG)
+    for name, level in app.config['LOG_LEVELS'].items():
+        level = logging.getLevelName(level) if isinstance(level, str) else level
+        logging.getLogger(name or None).setLevel(level if debug_enabled else max(level, logging.INFO))
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+def _restart_listener_in_child():
+    # Threads do not survive fork (e.g. gunicorn's preload_app), so forked
+    # workers need their own listener; a fresh queue avoids inheriting a
+    # lock held by the parent's listener thread
+    global _listener
+    if _listener is None:
+        return
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+atexit.register(_stop_listener)
+os.register_at_fork(after_in_child=_restart_listener_in_child)
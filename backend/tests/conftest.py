@@ -0,0 +1,36 @@
+import pytest
+from app import create_app
+from models import db
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def register(client, username='alice', password='secret123'):
+    """Register and log in a user; returns the Authorization header for them."""
+    client.post('/api/auth/register', json={
+        'username': username, 'email': f'{username}@example.com', 'password': password
+    })
+    response = client.post('/api/auth/login', json={'username': username, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+@pytest.fixture
+def headers(client):
+    return register(client)
+
+def create_expense(client, headers, **fields):
+    """Create an expense through the API and return its JSON."""
+    data = dict({'amount': 12.5, 'description': 'Lunch', 'category': 'Food', 'date': '2024-03-01'}, **fields)
+    response = client.post('/api/expenses', json=data, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['expense']
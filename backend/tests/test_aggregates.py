@@ -0,0 +1,44 @@
+from decimal import Decimal
+from sqlalchemy.dialects import postgresql
+from conftest import create_expense
+from aggregates import apply_count_deltas, bump_data_versions, rebuild_expense_stats
+from models import ExpenseCount, ExpenseRollup
+
+def aggregate_rows():
+    counts = sorted((row.user_id, row.category, row.count) for row in ExpenseCount.query.filter(ExpenseCount.count != 0))
+    rollups = sorted(
+        (row.user_id, row.category, row.month, Decimal(row.total), row.count)
+        for row in ExpenseRollup.query.filter(ExpenseRollup.count != 0)
+    )
+    return counts, rollups
+
+def test_maintained_aggregates_match_a_rebuild(app, client, headers):
+    first = create_expense(client, headers, amount=10, category='Food', date='2024-01-05')
+    second = create_expense(client, headers, amount=20, category='Food', date='2024-02-05')
+    create_expense(client, headers, amount=5, category='Transportation', date='2024-02-06')
+    client.put(f"/api/expenses/{first['id']}", json={'category': 'Shopping', 'amount': 11}, headers=headers)
+    client.delete(f"/api/expenses/{second['id']}", headers=headers)
+    
+    with app.app_context():
+        maintained = aggregate_rows()
+        rebuild_expense_stats()
+        assert aggregate_rows() == maintained
+        assert maintained[0] == [(1, 'Shopping', 1), (1, 'Transportation', 1)]
+
+class RecordingConnection:
+    dialect = postgresql.dialect()
+    
+    def __init__(self):
+        self.statements = []
+    
+    def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=self.dialect)))
+
+def test_counters_are_upserted_in_one_statement_on_postgresql():
+    connection = RecordingConnection()
+    apply_count_deltas(connection, {(1, 'Food'): 1})
+    bump_data_versions(connection, {1})
+    
+    assert len(connection.statements) == 2
+    assert 'ON CONFLICT (user_id, category) DO UPDATE SET count = (expense_counts.count + excluded.count)' in connection.statements[0]
+    assert 'ON CONFLICT (user_id) DO UPDATE' in connection.statements[1]
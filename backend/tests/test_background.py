@@ -0,0 +1,34 @@
+import threading
+import time
+from background import ProcessThread
+from blocklist import token_blocklist
+
+def test_concurrent_first_uses_start_one_thread():
+    started = []
+    release = threading.Event()
+    worker = ProcessThread(lambda: started.append(1) or release.wait(), 'test-worker', setup=lambda: time.sleep(0.05))
+    
+    callers = [threading.Thread(target=worker.ensure_started) for _ in range(8)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    time.sleep(0.05)
+    release.set()
+    
+    assert started == [1]
+
+def test_blocklist_starts_one_pruner_per_process(app, client, headers):
+    app.config['BLOCKLIST_PRUNE_INTERVAL'] = 3600
+    token_blocklist.init_app(app)
+    before = {thread.ident for thread in threading.enumerate() if thread.name == 'token-blocklist-pruner'}
+    
+    callers = [threading.Thread(target=client.get, args=('/api/auth/me',), kwargs={'headers': headers}) for _ in range(8)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    
+    pruners = {thread.ident for thread in threading.enumerate() if thread.name == 'token-blocklist-pruner'}
+    assert len(pruners - before) <= 1
+    assert token_blocklist.pruner.pid is not None
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+from blocklist import TokenBlocklist, token_blocklist
+from models import db, RevokedToken
+
+def test_other_workers_see_revocations_made_after_a_prune(app):
+    app.config['BLOCKLIST_PRUNE_INTERVAL'] = 0
+    other_worker = TokenBlocklist(app)
+    token_blocklist.init_app(app)
+    expired = datetime.utcnow() - timedelta(minutes=1)
+
+    with app.app_context():
+        for jti in ('a', 'b', 'c'):
+            token_blocklist.revoke(jti, expired)
+        assert not other_worker.is_revoked('d')
+
+        token_blocklist.prune()
+        token_blocklist.revoke('d', datetime.utcnow() + timedelta(hours=1))
+        other_worker.next_sync = 0.0
+        assert other_worker.is_revoked('d')
+
+def test_prune_keeps_the_newest_revocation(app):
+    token_blocklist.init_app(app)
+    expired = datetime.utcnow() - timedelta(minutes=1)
+
+    with app.app_context():
+        for jti in ('a', 'b'):
+            token_blocklist.revoke(jti, expired)
+        assert token_blocklist.prune() == 1
+        assert [token.jti for token in RevokedToken.query.all()] == ['b']
+
+def test_init_app_starts_a_fresh_filter(app):
+    token_blocklist.init_app(app)
+    with app.app_context():
+        token_blocklist.revoke('a', datetime.utcnow() + timedelta(hours=1))
+        assert token_blocklist.last_id == 1
+
+    token_blocklist.init_app(app)
+    assert token_blocklist.bloom is None
+    assert token_blocklist.last_id == 0
+    with app.app_context():
+        db.session.execute(RevokedToken.__table__.delete())
+        db.session.commit()
+        assert not token_blocklist.is_revoked('a')
@@ -0,0 +1,36 @@
+import pytest
+from conftest import create_expense
+
+VALID = {'amount': 12.5, 'description': 'Lunch', 'category': 'Food', 'date': '2024-03-01'}
+
+def expense_count(client, headers):
+    return client.get('/api/expenses', headers=headers).get_json()['total']
+
+def test_atomic_bulk_create_rejects_every_row(client, headers):
+    response = client.post('/api/expenses/bulk', json={'expenses': [VALID, dict(VALID, amount=-1)]}, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [{'index': 1, 'error': 'Amount must be greater than 0'}]
+    assert expense_count(client, headers) == 0
+
+def test_partial_bulk_create_stores_the_valid_rows(client, headers):
+    items = [VALID, dict(VALID, category='Nope'), dict(VALID, amount=3)]
+    response = client.post('/api/expenses/bulk?atomic=false', json={'expenses': items}, headers=headers)
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['created'] == 2
+    assert [error['index'] for error in body['errors']] == [1]
+    assert expense_count(client, headers) == 2
+
+@pytest.mark.parametrize('amount', ['NaN', 'Infinity', '-Infinity', float('nan'), float('inf')])
+def test_non_finite_amounts_are_rejected(client, headers, amount):
+    response = client.post('/api/expenses', json=dict(VALID, amount=amount), headers=headers)
+    assert response.status_code == 400
+
+    for atomic in ('true', 'false'):
+        response = client.post(f'/api/expenses/bulk?atomic={atomic}', json={'expenses': [dict(VALID, amount=amount)]}, headers=headers)
+        assert response.status_code == 400
+
+    expense = create_expense(client, headers)
+    response = client.put(f"/api/expenses/{expense['id']}", json={'amount': amount}, headers=headers)
+    assert response.status_code == 400
+    assert client.get('/api/expenses/summary', headers=headers).status_code == 200
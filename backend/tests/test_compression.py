@@ -0,0 +1,79 @@
+import gzip
+import json
+import pytest
+import compression as compression_module
+from compression import compression
+from conftest import create_expense
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+@pytest.fixture
+def expenses(client, headers):
+    # Enough expenses for the list to pass the 1 KiB threshold
+    for number in range(12):
+        create_expense(client, headers, description=f'Expense {number}', date=f'2024-03-{number + 1:02d}')
+
+def test_large_responses_are_gzipped(client, headers, expenses):
+    plain = client.get('/api/expenses', headers=headers)
+    compressed = client.get('/api/expenses', headers=dict(headers, **GZIP))
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert len(compressed.get_data()) < len(plain.get_data())
+    assert json.loads(gzip.decompress(compressed.get_data())) == plain.get_json()
+
+def test_small_responses_are_sent_as_they_are(client, headers):
+    before = compression.stats()['responses_skipped_small']
+    response = client.get('/api/expenses', headers=dict(headers, **GZIP))
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert compression.stats()['responses_skipped_small'] == before + 1
+
+def test_threshold_follows_the_config(app, client, headers):
+    app.extensions['compression'].min_size = 0
+    response = client.get('/api/health', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.get_data()))['status'] == 'healthy'
+
+def test_unlisted_mimetypes_are_not_compressed(app, client, headers, expenses):
+    app.extensions['compression'].mimetypes.discard('application/json')
+    response = client.get('/api/expenses', headers=dict(headers, **GZIP))
+    assert 'Content-Encoding' not in response.headers
+
+def test_unacceptable_encodings_are_not_used(client, headers, expenses):
+    response = client.get('/api/expenses', headers=dict(headers, **{'Accept-Encoding': 'gzip;q=0, identity'}))
+    assert 'Content-Encoding' not in response.headers
+
+def test_brotli_is_preferred_when_installed(client, headers, expenses, monkeypatch):
+    brotli = pytest.importorskip('brotli')
+    monkeypatch.setattr(compression_module, 'brotli', brotli)
+    response = client.get('/api/expenses', headers=dict(headers, **{'Accept-Encoding': 'gzip, br'}))
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.get_data()))['total'] == 12
+
+def test_streamed_exports_are_compressed_chunk_by_chunk(app, client, headers, expenses):
+    app.config['EXPORT_BATCH_SIZE'] = 4
+    plain = client.get('/api/expenses/export', headers=headers).get_data()
+    response = client.get('/api/expenses/export', headers=dict(headers, **GZIP))
+    assert response.is_streamed
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+
+    before = compression.stats()
+    chunks = list(response.response)
+    # Each batch is flushed on its own, then the gzip trailer follows
+    assert len(chunks) == 4
+    assert gzip.decompress(b''.join(chunks)) == plain
+    after = compression.stats()
+    assert after['responses_compressed'] == before['responses_compressed'] + 1
+    assert after['bytes_in'] - before['bytes_in'] == len(plain)
+
+def test_counters_are_exported_as_metrics(client, headers, expenses):
+    client.get('/api/expenses', headers=dict(headers, **GZIP))
+    stats = compression.stats()
+    lines = client.get('/api/metrics').get_data(as_text=True).splitlines()
+    assert '# TYPE http_compression_bytes_in_total counter' in lines
+    assert f"http_compression_bytes_in_total {stats['bytes_in']}" in lines
+    assert f"http_compression_bytes_out_total {stats['bytes_out']}" in lines
+    assert f"http_compression_responses_total{{result=\"compressed\"}} {stats['responses_compressed']}" in lines
+    assert any(line.startswith('http_compression_responses_total{result="skipped_small"} ') for line in lines)
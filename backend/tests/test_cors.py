@@ -0,0 +1,64 @@
+import pytest
+from flask import Flask
+from config import Config
+from cors import CORS
+
+ALLOWED = 'https://fluffy-space-5000.app.github.dev'
+PREFLIGHT = {'Origin': ALLOWED, 'Access-Control-Request-Method': 'POST', 'Access-Control-Request-Headers': 'Authorization'}
+
+def matches(origins, origin):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['CORS_ORIGINS'] = origins
+    return CORS(app).is_allowed(origin)
+
+@pytest.mark.parametrize('origin, allowed', [
+    ('https://fluffy-space-5000.app.github.dev', True),
+    ('https://a.b.app.github.dev', True),
+    ('HTTPS://Fluffy-5000.App.GitHub.dev', True),
+    ('http://localhost:3000', True),
+    ('https://app.github.dev', False),
+    ('http://fluffy-5000.app.github.dev', False),
+    ('https://fluffy.app.github.dev.evil.com', False),
+    ('https://evil.com/.app.github.dev', False),
+    ('http://localhost:3001', False),
+])
+def test_origin_matching(origin, allowed):
+    assert matches(['http://localhost:3000/', 'https://*.app.github.dev'], origin) is allowed
+
+def test_bare_wildcard_allows_every_origin():
+    assert matches(['*'], 'https://anywhere.example')
+
+def test_preflight_is_answered_without_authentication(client):
+    response = client.options('/api/expenses', headers=PREFLIGHT)
+    assert response.status_code == 204
+    assert response.headers['Access-Control-Allow-Origin'] == ALLOWED
+    assert response.headers['Access-Control-Allow-Credentials'] == 'true'
+    assert response.headers['Access-Control-Max-Age'] == '7200'
+    assert 'POST' in response.headers['Access-Control-Allow-Methods']
+    assert 'Authorization' in response.headers['Access-Control-Allow-Headers']
+    assert 'Origin' in response.headers['Vary']
+
+def test_preflight_from_a_disallowed_origin_gets_no_grant(client):
+    response = client.options('/api/expenses', headers=dict(PREFLIGHT, Origin='https://evil.example'))
+    assert response.status_code == 204
+    assert 'Access-Control-Allow-Origin' not in response.headers
+    assert 'Access-Control-Allow-Credentials' not in response.headers
+
+def test_responses_carry_credentials_and_exposed_headers(client, headers):
+    response = client.get('/api/expenses', headers=dict(headers, Origin=ALLOWED))
+    assert response.headers['Access-Control-Allow-Origin'] == ALLOWED
+    assert response.headers['Access-Control-Allow-Credentials'] == 'true'
+    assert response.headers['Access-Control-Expose-Headers'] == 'ETag'
+    assert 'Origin' in response.headers['Vary']
+
+def test_error_responses_carry_cors_headers(client):
+    response = client.get('/api/expenses', headers={'Origin': ALLOWED})
+    assert response.status_code == 401
+    assert response.headers['Access-Control-Allow-Origin'] == ALLOWED
+
+def test_disallowed_origins_get_no_cors_headers(client, headers):
+    response = client.get('/api/expenses', headers=dict(headers, Origin='https://evil.example'))
+    assert response.status_code == 200
+    assert 'Access-Control-Allow-Origin' not in response.headers
+    assert 'Origin' in response.headers['Vary']
@@ -0,0 +1,72 @@
+import logging
+import pytest
+from app import create_app
+from config import Config, TestingConfig
+from db_tuning import _pragma_matches, check_database_settings, database_settings
+from models import db
+
+@pytest.fixture
+def file_app(monkeypatch, tmp_path):
+    """An app on a database file, with the default pool and pragmas."""
+    def build(**settings):
+        monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'tuning.db'}")
+        monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_ENGINE_OPTIONS', Config.SQLALCHEMY_ENGINE_OPTIONS)
+        for name, value in settings.items():
+            monkeypatch.setattr(TestingConfig, name, value)
+        apps.append(create_app('testing'))
+        return apps[-1]
+    apps = []
+    yield build
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+
+def test_pragmas_and_pool_settings_take_effect(file_app):
+    settings = database_settings(file_app())
+    assert settings['pool'] == 'QueuePool'
+    assert (settings['pool_size'], settings['max_overflow'], settings['pool_timeout']) == (10, 20, 30)
+    assert settings['journal_mode'] == 'wal'
+    assert (settings['synchronous'], settings['temp_store']) == (1, 2)
+    assert (settings['busy_timeout'], settings['cache_size']) == (5000, -20000)
+
+def test_every_new_connection_is_tuned(file_app):
+    app = file_app()
+    with app.app_context():
+        with db.engine.connect() as first, db.engine.connect() as second:
+            for connection in (first, second):
+                assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+                assert connection.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+
+def test_without_pragmas_connections_keep_sqlite_defaults(file_app):
+    app = file_app(SQLITE_PRAGMAS={})
+    with app.app_context(), db.engine.connect() as connection:
+        assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'delete'
+
+def test_settings_are_logged_at_startup(file_app, caplog):
+    caplog.set_level(logging.INFO, logger='db_tuning')
+    file_app(DATABASE_STARTUP_CHECK=True)
+    record, = [record for record in caplog.records if record.getMessage() == 'database settings']
+    assert record.settings['journal_mode'] == 'wal'
+    assert not [record for record in caplog.records if record.levelno == logging.WARNING]
+
+def test_pragmas_that_do_not_take_are_warned_about(file_app, caplog):
+    app = file_app(SQLITE_PRAGMAS=dict(Config.SQLITE_PRAGMAS, journal_mode='bogus'))
+    check_database_settings(app)
+    warning, = [record for record in caplog.records if record.levelno == logging.WARNING]
+    assert (warning.pragma, warning.wanted, warning.actual) == ('journal_mode', 'bogus', 'delete')
+
+def test_in_memory_journal_mode_is_expected(app, caplog):
+    settings = check_database_settings(app)
+    assert settings['journal_mode'] == 'memory'
+    assert not [record for record in caplog.records if record.levelno == logging.WARNING]
+
+@pytest.mark.parametrize('name, wanted, actual, matches', [
+    ('synchronous', 'NORMAL', 1, True),
+    ('synchronous', 'full', 1, False),
+    ('temp_store', 'memory', 2, True),
+    ('journal_mode', 'WAL', 'wal', True),
+    ('busy_timeout', 5000, 5000, True),
+    ('mmap_size', 268435456, 0, False),
+])
+def test_pragma_values_are_compared_as_sqlite_reports_them(name, wanted, actual, matches):
+    assert _pragma_matches(name, wanted, actual) is matches
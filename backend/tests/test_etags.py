@@ -0,0 +1,29 @@
+from conftest import create_expense
+
+def test_description_only_update_changes_the_etag(client, headers):
+    expense = create_expense(client, headers, description='Lunch')
+    url = f"/api/expenses/{expense['id']}"
+    etag = client.get(url, headers=headers).headers['ETag']
+    
+    client.put(url, json={'description': 'Dinner'}, headers=headers)
+    response = client.get(url, headers=dict(headers, **{'If-None-Match': etag}))
+    
+    assert response.status_code == 200
+    assert response.get_json()['expense']['description'] == 'Dinner'
+
+def test_unchanged_data_is_not_modified(client, headers):
+    create_expense(client, headers)
+    etag = client.get('/api/expenses', headers=headers).headers['ETag']
+    response = client.get('/api/expenses', headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+
+def test_every_write_changes_the_list_etag(client, headers):
+    expense = create_expense(client, headers)
+    etags = {client.get('/api/expenses', headers=headers).headers['ETag']}
+    
+    client.put(f"/api/expenses/{expense['id']}", json={'description': 'Dinner'}, headers=headers)
+    etags.add(client.get('/api/expenses', headers=headers).headers['ETag'])
+    client.delete(f"/api/expenses/{expense['id']}", headers=headers)
+    etags.add(client.get('/api/expenses', headers=headers).headers['ETag'])
+    
+    assert len(etags) == 3
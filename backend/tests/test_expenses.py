@@ -0,0 +1,6 @@
+import pytest
+
+@pytest.mark.parametrize('payload', [{'amount': 'abc'}, {'category': 'Nope'}, {}])
+def test_updating_a_missing_expense_is_not_found(client, headers, payload):
+    response = client.put('/api/expenses/999', json=payload, headers=headers)
+    assert response.status_code == 404
@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+import pytest
+from conftest import create_expense, register
+
+@pytest.fixture
+def expenses(client, headers):
+    create_expense(client, headers, description='Groceries', category='Food', date='2024-03-01', amount=20)
+    create_expense(client, headers, description='Train', category='Transportation', date='2024-03-15', amount=4.5)
+    create_expense(client, headers, description='Coffee', category='Food', date='2024-04-02', amount=3)
+
+def export(client, headers, **args):
+    response = client.get('/api/expenses/export', query_string=args, headers=headers)
+    assert response.status_code == 200
+    return response
+
+def test_csv_export_streams_every_expense_newest_first(client, headers, expenses):
+    response = export(client, headers)
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=expenses.csv'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['description'] for row in rows] == ['Coffee', 'Train', 'Groceries']
+    assert rows[1]['amount'] == '4.50'
+
+def test_ndjson_export_matches_the_expense_shape(client, headers, expenses):
+    response = export(client, headers, format='ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    documents = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    listed = client.get('/api/expenses', headers=headers).get_json()['expenses']
+    assert documents == listed
+
+@pytest.mark.parametrize('args, expected', [
+    ({'category': 'Food'}, ['Coffee', 'Groceries']),
+    ({'date_from': '2024-03-10'}, ['Coffee', 'Train']),
+    ({'date_to': '2024-03-15'}, ['Train', 'Groceries']),
+    ({'date_from': '2024-03-01', 'date_to': '2024-03-31', 'category': 'Food'}, ['Groceries']),
+    ({'q': 'coff'}, ['Coffee']),
+])
+def test_export_applies_the_list_filters(client, headers, expenses, args, expected):
+    response = export(client, headers, format='ndjson', **args)
+    assert [json.loads(line)['description'] for line in response.get_data(as_text=True).splitlines()] == expected
+
+def test_export_only_includes_the_callers_expenses(client, headers, expenses):
+    other = register(client, 'bob')
+    assert export(client, other, format='ndjson').get_data() == b''
+    assert export(client, other).get_data(as_text=True).splitlines() == [
+        'id,date,category,description,amount,created_at,updated_at'
+    ]
+
+@pytest.mark.parametrize('args', [{'format': 'xml'}, {'date_from': '03/01/2024'}, {'date_to': 'soon'}])
+def test_export_rejects_bad_arguments(client, headers, args):
+    response = client.get('/api/expenses/export', query_string=args, headers=headers)
+    assert response.status_code == 400
+
+def test_export_writes_one_chunk_per_batch(app, client, headers, expenses):
+    app.config['EXPORT_BATCH_SIZE'] = 1
+    response = client.get('/api/expenses/export', headers=headers)
+    chunks = list(response.response)
+    assert len(chunks) == 3
+    assert b''.join(chunks).decode().count('\n') == 4
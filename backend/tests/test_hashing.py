@@ -0,0 +1,22 @@
+import os
+import pytest
+from hashing import PasswordHasher, pool_size
+
+@pytest.mark.parametrize('web_workers', [1, 2, 4, 2 * (os.cpu_count() or 1) + 1])
+def test_hashing_processes_stay_bounded_across_web_workers(web_workers):
+    cpus = os.cpu_count() or 1
+    per_worker = pool_size(None, web_workers)
+    assert per_worker >= 1
+    assert web_workers * per_worker <= max(cpus, web_workers)
+
+def test_configured_pool_size_wins():
+    assert pool_size(0, 8) == 0
+    assert pool_size(3, 8) == 3
+
+def test_inline_hasher_round_trip(app):
+    hasher = PasswordHasher(app)
+    password_hash = hasher.hash('secret123')
+    assert hasher.verify(password_hash, 'secret123')
+    assert not hasher.verify(password_hash, 'wrong')
+    assert not hasher.needs_rehash(password_hash)
+    assert hasher.stats()['workers'] == 0
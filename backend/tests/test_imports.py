@@ -0,0 +1,41 @@
+import io
+import json
+import importers
+
+CSV = 'date,amount,description,category\n' + ''.join(
+    f'2024-03-0{day},{day}.50,Item {day},Food\n' for day in range(1, 6)
+)
+
+def upload(client, headers, query=''):
+    return client.post(
+        f'/api/imports{query}',
+        data={'file': (io.BytesIO(CSV.encode()), 'statement.csv')},
+        headers=headers,
+        content_type='multipart/form-data'
+    )
+
+def test_import_reports_imported_rows(client, headers):
+    response = upload(client, headers)
+    assert response.status_code == 201
+    assert response.get_json()['imported'] == 5
+
+def test_streamed_import_reports_a_failure(app, client, headers, monkeypatch):
+    app.config['IMPORT_CHUNK_SIZE'] = 2
+    insert = importers.insert_expenses
+    calls = []
+    
+    def failing_insert(rows, batch_size):
+        calls.append(rows)
+        if len(calls) == 2:
+            raise RuntimeError('disk full')
+        insert(rows, batch_size)
+    
+    monkeypatch.setattr(importers, 'insert_expenses', failing_insert)
+    response = upload(client, headers, '?progress=stream')
+    reports = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    
+    assert reports[0]['imported'] == 2
+    assert reports[-1]['error'] == 'Failed to import statement'
+    assert reports[-1]['imported'] == 2
+    assert reports[-1]['done'] is True
+    assert client.get('/api/expenses', headers=headers).get_json()['total'] == 2
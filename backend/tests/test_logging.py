@@ -0,0 +1,88 @@
+import json
+import logging
+import sys
+import pytest
+import structured_logging
+from app import create_app
+from config import TestingConfig
+from conftest import register
+from models import db
+from structured_logging import DebugSampler, JSONFormatter, TextFormatter
+
+def make_record(level=logging.INFO, message='login succeeded', exc_info=None, **extra):
+    record = logging.LogRecord('routes.auth', level, __file__, 1, message, None, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+@pytest.fixture
+def logging_app(monkeypatch, capsys):
+    """Build an app with the given logging settings, writing to the captured stderr."""
+    def build(**settings):
+        for name, value in settings.items():
+            monkeypatch.setattr(TestingConfig, name, value)
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+        return app
+    yield build
+    logging.disable(logging.NOTSET)
+    logging.getLogger().setLevel(logging.WARNING)
+
+def logged(capsys):
+    """Wait for the listener to write out every queued record and return the output lines."""
+    structured_logging._listener.stop()
+    structured_logging._listener.start()
+    return capsys.readouterr().err.splitlines()
+
+def test_json_lines_carry_extra_fields(logging_app, capsys):
+    app = logging_app(LOG_LEVELS={'': 'INFO'})
+    register(app.test_client())
+    entries = [json.loads(line) for line in logged(capsys)]
+    login = next(entry for entry in entries if entry['message'] == 'login succeeded')
+    assert login['level'] == 'INFO'
+    assert login['logger'] == 'routes.auth'
+    assert login['user_id'] == 1
+    assert login['time'].endswith('+00:00')
+
+def test_text_format_appends_fields_as_pairs(logging_app, capsys):
+    app = logging_app(LOG_FORMAT='text', LOG_LEVELS={'': 'INFO'})
+    register(app.test_client())
+    line = next(line for line in logged(capsys) if 'login succeeded' in line)
+    assert ' INFO    routes.auth: login succeeded user_id=1' in line
+
+def test_json_formatter_includes_exceptions_and_unserializable_values():
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record = make_record(logging.ERROR, exc_info=sys.exc_info(), settings={'journal_mode': 'wal'}, error=object())
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry['settings'] == {'journal_mode': 'wal'}
+    assert entry['error'].startswith('<object object')
+    assert 'ValueError: boom' in entry['exception']
+
+def test_records_without_extra_fields_have_no_trailing_pairs():
+    assert TextFormatter().format(make_record()).endswith('routes.auth: login succeeded')
+
+def test_only_a_sample_of_debug_records_pass(monkeypatch):
+    sampler = DebugSampler(0.25)
+    draws = iter([0.1, 0.5, 0.2, 0.9])
+    monkeypatch.setattr(structured_logging.random, 'random', lambda: next(draws))
+    assert [sampler.filter(make_record(logging.DEBUG)) for _ in range(4)] == [True, False, True, False]
+    assert sampler.filter(make_record(logging.INFO))
+    assert DebugSampler(1.0).filter(make_record(logging.DEBUG))
+
+def test_debug_can_be_disabled_process_wide(logging_app, capsys):
+    logging_app(LOG_LEVELS={'': 'DEBUG'}, LOG_DEBUG_ENABLED=False)
+    logging.getLogger('app').debug('hidden')
+    assert logging.getLogger().level == logging.INFO
+    assert not logging.getLogger('app').isEnabledFor(logging.DEBUG)
+    assert not any('hidden' in line for line in logged(capsys))
+
+def test_request_debug_records_name_the_path(logging_app, capsys):
+    app = logging_app(LOG_LEVELS={'': 'DEBUG'}, LOG_DEBUG_SAMPLE_RATE=1.0)
+    app.test_client().get('/api/health?verbose=1', headers={'Origin': 'http://localhost:3000'})
+    entries = [json.loads(line) for line in logged(capsys) if line.startswith('{')]
+    request = next(entry for entry in entries if entry['message'] == 'request')
+    assert request['level'] == 'DEBUG'
+    assert request['path'] == '/api/health?verbose=1'
+    assert request['origin'] == 'http://localhost:3000'
@@ -0,0 +1,85 @@
+import pytest
+from app import create_app
+from config import TestingConfig
+from conftest import create_expense
+from metrics import Counter, Histogram
+
+def scrape(client):
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+    return response.get_data(as_text=True).splitlines()
+
+def sample(lines, name, **labels):
+    """Return the value of the sample whose labels include ``labels``."""
+    wanted = [f'{key}="{value}"' for key, value in labels.items()]
+    for line in lines:
+        series, _, value = line.rpartition(' ')
+        if series.split('{')[0] == name and all(label in series for label in wanted):
+            return float(value)
+    return None
+
+LIST = {'blueprint': 'expenses', 'endpoint': 'expenses.get_expenses', 'method': 'GET'}
+
+def test_requests_are_counted_by_endpoint_and_status(client, headers):
+    before = scrape(client)
+    client.get('/api/expenses', headers=headers)
+    client.get('/api/expenses', headers=headers)
+    client.get('/api/expenses/999', headers=headers)
+    lines = scrape(client)
+
+    def delta(name, **labels):
+        return sample(lines, name, **labels) - (sample(before, name, **labels) or 0)
+
+    assert delta('http_responses_total', status=200, **LIST) == 2
+    assert delta('http_responses_total', endpoint='expenses.get_expense', status=404) == 1
+    assert delta('http_request_duration_seconds_count', **LIST) == 2
+
+def test_unmatched_urls_share_one_series(client):
+    client.get('/api/nowhere')
+    client.get('/api/elsewhere/1')
+    lines = scrape(client)
+    assert sample(lines, 'http_responses_total', endpoint='unmatched', status=404) >= 2
+    assert not any('nowhere' in line or 'elsewhere' in line for line in lines)
+
+def test_sql_statements_are_attributed_to_the_request(client, headers):
+    create_expense(client, headers)
+    before = scrape(client)
+    client.get('/api/expenses/summary', headers=headers)
+    lines = scrape(client)
+    labels = dict(LIST, endpoint='expenses.get_expense_summary')
+    assert sample(before, 'http_request_sql_queries_sum', **labels) is None
+    assert sample(lines, 'http_request_sql_queries_sum', **labels) >= 1
+    assert sample(lines, 'http_request_sql_duration_seconds_count', **labels) >= 1
+    # The scrape itself runs no SQL
+    assert sample(lines, 'http_request_sql_queries_bucket', endpoint='get_metrics', le='0.0') == sample(
+        lines, 'http_request_sql_queries_count', endpoint='get_metrics')
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('latency_seconds', 'Latency.', ('endpoint',), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(('list',), value)
+    lines = []
+    histogram.render(lines)
+    assert lines == [
+        '# HELP latency_seconds Latency.',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{endpoint="list",le="0.1"} 2',
+        'latency_seconds_bucket{endpoint="list",le="1.0"} 3',
+        'latency_seconds_bucket{endpoint="list",le="+Inf"} 4',
+        'latency_seconds_sum{endpoint="list"} 3.65',
+        'latency_seconds_count{endpoint="list"} 4',
+    ]
+
+def test_label_values_are_escaped():
+    counter = Counter('events_total', 'Events.', ('path',))
+    counter.inc(('a"b\\c\nd',))
+    lines = []
+    counter.render(lines)
+    assert lines[-1] == 'events_total{path="a\\"b\\\\c\\nd"} 1'
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'METRICS_ENABLED', False)
+    client = create_app('testing').test_client()
+    client.get('/api/health')
+    assert not any(line.startswith('http_request') for line in scrape(client))
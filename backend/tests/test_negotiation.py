@@ -0,0 +1,68 @@
+import json
+from decimal import Decimal
+import pytest
+import serializers
+from conftest import create_expense
+from serializers import ARROW_MIMETYPE, MSGPACK_MIMETYPE
+
+# Both packages are optional; without them their formats are not offered
+msgpack = pytest.importorskip('msgpack')
+pyarrow = pytest.importorskip('pyarrow')
+pyarrow_ipc = pytest.importorskip('pyarrow.ipc')
+
+@pytest.fixture
+def expenses(client, headers):
+    create_expense(client, headers, description='Lunch', amount=12.5, date='2024-03-01')
+    create_expense(client, headers, description='Taxi', amount=30.1, category='Transportation', date='2024-03-02')
+
+def get(client, headers, url, accept):
+    response = client.get(url, headers=dict(headers, Accept=accept))
+    assert response.status_code == 200
+    assert response.mimetype == accept
+    assert 'Accept' in response.headers['Vary']
+    return response
+
+def read_arrow(response):
+    table = pyarrow_ipc.open_stream(response.get_data()).read_all()
+    return table, json.loads(table.schema.metadata[b'meta'])
+
+def test_msgpack_list_sends_field_names_once(client, headers, expenses):
+    body = msgpack.unpackb(get(client, headers, '/api/expenses?fields=description,amount,date', MSGPACK_MIMETYPE).get_data())
+    assert body['fields'] == ['description', 'amount', 'date']
+    assert body['rows'] == [['Taxi', '30.10', '2024-03-02'], ['Lunch', '12.50', '2024-03-01']]
+    assert body['total'] == 2
+
+def test_arrow_list_is_columnar_with_exact_amounts(client, headers, expenses):
+    table, meta = read_arrow(get(client, headers, '/api/expenses', ARROW_MIMETYPE))
+    assert table.column_names == list(serializers.EXPENSE_FIELDS)
+    assert table.schema.field('amount').type == pyarrow.decimal128(10, 2)
+    assert table.column('amount').to_pylist() == [Decimal('30.10'), Decimal('12.50')]
+    assert meta['total'] == 2
+
+def test_summary_in_every_format_agrees(client, headers, expenses):
+    as_json = client.get('/api/expenses/summary', headers=headers).get_json()
+    as_msgpack = msgpack.unpackb(get(client, headers, '/api/expenses/summary', MSGPACK_MIMETYPE).get_data())
+    table, meta = read_arrow(get(client, headers, '/api/expenses/summary', ARROW_MIMETYPE))
+
+    assert as_json['total_amount'] == 42.6
+    assert as_msgpack['total_amount'] == meta['total_amount'] == '42.60'
+    assert as_msgpack['categories'] == [
+        {'category': c['category'], 'total': f"{c['total']:.2f}", 'count': c['count']} for c in as_json['categories']
+    ]
+    assert table.column('category').to_pylist() == [c['category'] for c in as_json['categories']]
+
+@pytest.mark.parametrize('accept', [None, '*/*', 'application/json', 'text/html;q=0.5, application/json'])
+def test_json_is_the_default(client, headers, expenses, accept):
+    response = client.get('/api/expenses', headers=dict(headers, **({'Accept': accept} if accept else {})))
+    assert response.mimetype == 'application/json'
+
+def test_formats_are_cached_separately(client, headers, expenses):
+    client.get('/api/expenses', headers=headers)
+    assert get(client, headers, '/api/expenses', MSGPACK_MIMETYPE).get_data()[:1] != b'{'
+
+@pytest.mark.parametrize('url', ['/api/expenses', '/api/expenses/summary'])
+def test_unavailable_formats_are_not_acceptable(client, headers, url, monkeypatch):
+    monkeypatch.setattr(serializers, 'msgpack', None)
+    response = client.get(url, headers=dict(headers, Accept=MSGPACK_MIMETYPE))
+    assert response.status_code == 406
+    assert client.get(url, headers=dict(headers, Accept='text/html')).status_code == 406
@@ -0,0 +1,49 @@
+import base64
+import json
+from sqlalchemy import inspect, text
+from conftest import create_expense
+from models import db, ensure_expense_indexes
+from pagination import decode_cursor, encode_cursor
+
+def raw_cursor(*parts):
+    return base64.urlsafe_b64encode(json.dumps(parts).encode()).decode().rstrip('=')
+
+def test_cursor_pages_cover_every_expense(client, headers):
+    created = {create_expense(client, headers, date=f'2024-03-0{day % 3 + 1}')['id'] for day in range(5)}
+    
+    seen, cursor = [], ''
+    while cursor is not None:
+        page = client.get(f'/api/expenses?cursor={cursor}&limit=2', headers=headers).get_json()
+        seen += [expense['id'] for expense in page['expenses']]
+        cursor = page['next_cursor']
+    
+    assert sorted(seen) == sorted(created)
+
+def test_cursor_without_created_at_is_rejected(client, headers):
+    assert decode_cursor(raw_cursor('2024-03-01', None, 7)) is None
+    response = client.get(f"/api/expenses?cursor={raw_cursor('2024-03-01', None, 7)}", headers=headers)
+    assert response.status_code == 400
+
+def test_cursor_round_trip():
+    from datetime import date, datetime
+    position = (date(2024, 3, 1), datetime(2024, 3, 1, 12, 30), 7)
+    assert decode_cursor(encode_cursor(*position)) == position
+
+def test_existing_database_gets_keyset_index(app, client, headers):
+    create_expense(client, headers)
+    with app.app_context():
+        connection = db.session.connection()
+        connection.execute(text('DROP INDEX ix_expenses_user_date_created_id'))
+        connection.execute(text('UPDATE expenses SET created_at = NULL'))
+        db.session.commit()
+        
+        db.create_all()
+        
+        indexes = {index['name'] for index in inspect(db.engine).get_indexes('expenses')}
+        assert 'ix_expenses_user_date_created_id' in indexes
+        assert db.session.execute(text('SELECT COUNT(*) FROM expenses WHERE created_at IS NULL')).scalar() == 0
+
+def test_ensure_expense_indexes_is_idempotent(app):
+    with app.app_context():
+        ensure_expense_indexes(db.session.connection())
+        ensure_expense_indexes(db.session.connection())
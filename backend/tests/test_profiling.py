@@ -0,0 +1,65 @@
+import pstats
+import pytest
+from app import create_app
+from config import TestingConfig
+from conftest import create_expense, register
+from models import db
+from profiling import RequestProfiler
+
+TOKEN = 's3cret-profile-token'
+
+def build(monkeypatch, **settings):
+    for name, value in settings.items():
+        monkeypatch.setattr(TestingConfig, name, value)
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    return app
+
+@pytest.fixture
+def profiled(monkeypatch, tmp_path):
+    app = build(monkeypatch, PROFILER_ENABLED=True, PROFILER_TOKEN=TOKEN, PROFILER_DIR=str(tmp_path))
+    client = app.test_client()
+    return client, register(client), tmp_path
+
+@pytest.mark.parametrize('settings', [{}, {'PROFILER_ENABLED': True}, {'PROFILER_TOKEN': TOKEN}])
+def test_profiler_needs_both_the_flag_and_a_token(monkeypatch, settings):
+    app = build(monkeypatch, **settings)
+    assert not isinstance(app.wsgi_app, RequestProfiler)
+
+def test_requests_without_the_token_are_not_profiled(profiled):
+    client, headers, directory = profiled
+    assert client.get('/api/expenses', headers=headers).status_code == 200
+    assert client.get('/api/expenses', headers=dict(headers, **{'X-Profile-Token': 'guess'})).status_code == 200
+    assert list(directory.iterdir()) == []
+
+def test_token_requests_write_a_profile_and_collapsed_stacks(profiled):
+    client, headers, directory = profiled
+    create_expense(client, headers)
+    response = client.get('/api/expenses', headers=dict(headers, **{'X-Profile-Token': TOKEN}))
+    assert response.get_json() == client.get('/api/expenses', headers=headers).get_json()
+
+    files = sorted(path.name for path in directory.iterdir())
+    assert len(files) == 2
+    assert files[0].endswith('-GET-api_expenses.folded') and files[1].endswith('-GET-api_expenses.prof')
+    stats = pstats.Stats(str(directory / files[1]))
+    assert any(function == 'get_expenses' for _, _, function in stats.stats)
+    for line in (directory / files[0]).read_text().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert ';' in stack and int(count) > 0
+
+def test_streamed_responses_are_profiled_whole(profiled):
+    client, headers, directory = profiled
+    create_expense(client, headers)
+    plain = client.get('/api/expenses/export', headers=headers).get_data()
+    response = client.get('/api/expenses/export', headers=dict(headers, **{'X-Profile-Token': TOKEN}))
+    assert response.get_data() == plain
+    assert len(list(directory.glob('*-GET-api_expenses_export.prof'))) == 1
+
+def test_only_one_request_per_process_is_profiled_at_a_time(profiled):
+    client, headers, directory = profiled
+    profiler = client.application.wsgi_app
+    with profiler.lock:
+        response = client.get('/api/expenses', headers=dict(headers, **{'X-Profile-Token': TOKEN}))
+    assert response.status_code == 200
+    assert list(directory.iterdir()) == []
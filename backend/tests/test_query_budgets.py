@@ -0,0 +1,49 @@
+import pytest
+from blocklist import token_blocklist
+from conftest import create_expense
+from models import db
+from sql_diagnostics import query_budget
+
+@pytest.fixture
+def engine(app):
+    with app.app_context():
+        return db.engine
+
+@pytest.fixture
+def expenses(client, headers):
+    for day in ('2024-03-01', '2024-03-02', '2024-04-01'):
+        create_expense(client, headers, date=day)
+
+def test_list_budget(client, headers, engine, expenses):
+    # Data version, page of expenses and the maintained count
+    with query_budget(3, engine):
+        response = client.get('/api/expenses', headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['expenses']) == 3
+
+    # Served from the response cache after the data version check
+    with query_budget(1, engine):
+        assert client.get('/api/expenses', headers=headers).status_code == 200
+
+def test_summary_budget(client, headers, engine, expenses):
+    # Data version and one aggregate over the rollups
+    with query_budget(2, engine):
+        response = client.get('/api/expenses/summary', headers=headers)
+    assert response.status_code == 200
+
+def test_not_modified_budget(client, headers, engine, expenses):
+    etag = client.get('/api/expenses', headers=headers).headers['ETag']
+    with query_budget(1, engine):
+        response = client.get('/api/expenses', headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+
+def test_me_budget(app, client, headers, engine):
+    # Load the revoked-token filter first, so only the endpoint is counted
+    with app.app_context():
+        token_blocklist.is_revoked('warm-up')
+
+    # At most the user lookup; none once the identity cache has the user
+    with query_budget(1, engine):
+        assert client.get('/api/auth/me', headers=headers).status_code == 200
+    with query_budget(0, engine):
+        assert client.get('/api/auth/me', headers=headers).status_code == 200
@@ -0,0 +1,79 @@
+import pytest
+from app import create_app
+from config import TestingConfig
+from conftest import create_expense, register
+from models import db, Expense
+from read_routing import ReadRouting, read_routing
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_BINDS', {'replica': f"sqlite:///{tmp_path / 'replica.db'}"})
+    monkeypatch.setattr(TestingConfig, 'REPLICA_SYNC_INTERVAL', 0)
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all(bind_key=None)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # init_app registers a metadata per bind on the shared db object
+    db.metadatas.pop('replica', None)
+
+def reads(**expected):
+    return {name: read_routing.counters[name] + count for name, count in expected.items()}
+
+def test_reads_wait_for_the_replica_to_catch_up(app, client, headers):
+    create_expense(client, headers, description='Lunch')
+    read_routing.sync()
+    assert client.get('/api/expenses', headers=headers).status_code == 200
+
+    # Written as another worker would, outside this process's requests
+    with app.app_context():
+        db.session.get(Expense, 1).description = 'Dinner'
+        db.session.commit()
+    expected = reads(primary_reads=1, replica_reads=0)
+    response = client.get('/api/expenses', headers=headers)
+    assert [e['description'] for e in response.get_json()['expenses']] == ['Dinner']
+    assert {name: read_routing.counters[name] for name in expected} == expected
+
+    read_routing.sync()
+    expected = reads(primary_reads=0, replica_reads=1)
+    response = client.get('/api/expenses', headers=headers)
+    assert [e['description'] for e in response.get_json()['expenses']] == ['Dinner']
+    assert {name: read_routing.counters[name] for name in expected} == expected
+
+def test_account_changes_keep_the_user_on_the_primary(client):
+    headers = register(client)
+    read_routing.sync()
+    client.put('/api/user/profile', json={'username': 'alicia'}, headers=headers)
+
+    expected = reads(primary_reads=1)
+    response = client.get('/api/user/profile', headers=headers)
+    assert response.get_json()['user']['username'] == 'alicia'
+    assert read_routing.counters['primary_reads'] == expected['primary_reads']
+
+def test_new_users_read_from_the_primary(client):
+    register(client)
+    read_routing.sync()
+    headers = register(client, 'bob')
+    expected = reads(primary_reads=1)
+    assert client.get('/api/auth/me', headers=headers).status_code == 200
+    assert read_routing.counters['primary_reads'] == expected['primary_reads']
+
+def test_unsynced_replica_reads_from_the_primary(client):
+    headers = register(client)
+    expected = reads(primary_reads=1)
+    assert client.get('/api/auth/me', headers=headers).status_code == 200
+    assert read_routing.counters['primary_reads'] == expected['primary_reads']
+
+def test_one_process_syncs_the_replica(app):
+    leader, other = ReadRouting(app), ReadRouting(app)
+    assert leader.is_sync_leader()
+    assert not other.is_sync_leader()
+
+    # The lock goes with the leader's process
+    leader.leader_lock.close()
+    assert other.is_sync_leader()
+    other.leader_lock.close()
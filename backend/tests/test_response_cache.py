@@ -0,0 +1,104 @@
+import sqlite3
+import pytest
+from conftest import create_expense
+from models import db, Expense
+from hashing import password_hasher
+from response_cache import SQLiteCache
+
+def test_expense_entries_follow_writes_made_elsewhere(app, client, headers):
+    expense = create_expense(client, headers, description='Lunch')
+    assert client.get('/api/expenses', headers=headers).get_json()['expenses'][0]['description'] == 'Lunch'
+    
+    # A write handled by another worker process, which cannot invalidate this one's cache
+    with app.app_context():
+        db.session.get(Expense, expense['id']).description = 'Dinner'
+        db.session.commit()
+    
+    assert client.get('/api/expenses', headers=headers).get_json()['expenses'][0]['description'] == 'Dinner'
+
+def test_profile_follows_a_login_rehash(app, client, headers):
+    before = client.get('/api/user/profile', headers=headers).get_json()['user']
+    
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    password_hasher.init_app(app)
+    client.post('/api/auth/login', json={'username': 'alice', 'password': 'secret123'})
+    
+    after = client.get('/api/user/profile', headers=headers).get_json()['user']
+    assert after['updated_at'] != before['updated_at']
+
+def test_repeated_reads_are_served_from_the_cache(app, client, headers):
+    create_expense(client, headers)
+    client.get('/api/expenses/summary', headers=headers)
+    hits = app.extensions['response_cache'].stats()['hits']
+    client.get('/api/expenses/summary', headers=headers)
+    assert app.extensions['response_cache'].stats()['hits'] == hits + 1
+
+def test_sqlite_cache_bounds_total_bytes(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), max_entries=100, max_bytes=1000, ttl=60)
+    for n in range(10):
+        cache.set((1, 'expenses', f'/api/expenses?page={n}'), (b'x' * 300, 200, 'application/json', None))
+    
+    stats = cache.stats()
+    assert stats['bytes'] <= 1000
+    assert stats['entries'] == 3
+    assert cache.get((1, 'expenses', '/api/expenses?page=9')) is not None
+    assert cache.get((1, 'expenses', '/api/expenses?page=0')) is None
+
+def test_sqlite_cache_replaces_files_with_an_older_layout(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE response_cache (user_id INTEGER, namespace TEXT, request_key TEXT, '
+                       'expires_at REAL, body BLOB, status INTEGER, mimetype TEXT)')
+    connection.commit()
+    
+    cache = SQLiteCache(path, max_entries=10, max_bytes=1000, ttl=60)
+    cache.set((1, 'profile', '/api/user/profile'), (b'{}', 200, 'application/json', None))
+    assert cache.get((1, 'profile', '/api/user/profile')) == (b'{}', 200, 'application/json', None)
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_cache_hits_keep_the_vary_header(app, client, headers, backend, tmp_path):
+    app.instance_path = str(tmp_path)
+    app.config['RESPONSE_CACHE_BACKEND'] = backend
+    app.extensions['response_cache'].init_app(app)
+    create_expense(client, headers)
+    
+    first = client.get('/api/expenses', headers=headers)
+    second = client.get('/api/expenses', headers=headers)
+    
+    assert app.extensions['response_cache'].stats()['hits'] == 1
+    assert 'Accept' in second.headers['Vary']
+    assert second.headers['Vary'] == first.headers['Vary']
+
+def test_sqlite_cache_totals_follow_every_write(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = SQLiteCache(path, max_entries=5, max_bytes=10000, ttl=60)
+    for n in range(8):
+        cache.set((n % 2, 'expenses', f'/api/expenses?page={n}'), (b'x' * (n + 1), 200, 'application/json', None))
+    cache.set((1, 'expenses', '/api/expenses?page=7'), (b'y' * 50, 200, 'application/json', None))
+    cache.invalidate(0, 'expenses')
+    
+    actual = sqlite3.connect(path).execute('SELECT COUNT(*), SUM(LENGTH(body)) FROM response_cache').fetchone()
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes']) == actual == (3, 4 + 6 + 50)
+    assert stats['evictions'] == 3
+
+def test_sqlite_cache_only_scans_for_evictions_over_a_limit(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), max_entries=2, max_bytes=10000, ttl=60)
+    statements = []
+    cache._connection().set_trace_callback(statements.append)
+    
+    cache.set((1, 'expenses', 'a'), (b'x', 200, 'application/json', None))
+    cache.set((1, 'expenses', 'b'), (b'x', 200, 'application/json', None))
+    assert not any('ORDER BY' in statement for statement in statements)
+    
+    cache.set((1, 'expenses', 'c'), (b'x', 200, 'application/json', None))
+    assert any('ORDER BY' in statement for statement in statements)
+    assert cache.get((1, 'expenses', 'a')) is None
+
+def test_sqlite_cache_opens_new_connections_after_fork(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), max_entries=10, max_bytes=1000, ttl=60)
+    parent = cache._connection()
+    assert cache._connection() is parent
+    
+    monkeypatch.setattr('os.getpid', lambda: -1)
+    assert cache._connection() is not parent
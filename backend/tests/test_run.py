@@ -0,0 +1,60 @@
+import pytest
+import run
+from models import db
+from response_cache import response_cache
+
+gunicorn_base = pytest.importorskip('gunicorn.app.base')
+
+@pytest.fixture
+def servers(monkeypatch):
+    """Capture the gunicorn applications serve() would run."""
+    started = []
+    monkeypatch.setattr(gunicorn_base.BaseApplication, 'run', lambda self: started.append(self))
+    return started
+
+def serve(*argv):
+    run.serve(run.build_parser().parse_args(['serve', '--config', 'testing', *argv]))
+
+@pytest.mark.parametrize('cpus, workers', [(4, 9), (1, 3), (None, 3)])
+def test_default_workers_follow_the_cpu_count(monkeypatch, cpus, workers):
+    monkeypatch.setattr(run.os, 'cpu_count', lambda: cpus)
+    assert run.default_workers() == workers
+
+def test_serve_defaults(monkeypatch):
+    monkeypatch.setenv('PORT', '8080')
+    args = run.build_parser().parse_args(['serve'])
+    assert (args.config, args.bind, args.workers, args.threads) == ('production', '0.0.0.0:8080', run.default_workers(), 1)
+    assert run.build_parser().parse_args([]).command is None
+
+def test_serve_configures_a_preloading_gunicorn(servers):
+    serve('--workers', '3', '--threads', '4', '--bind', '127.0.0.1:9000', '--max-requests', '500', '--access-log')
+    server, = servers
+    cfg = server.cfg
+    assert (cfg.bind, cfg.workers, cfg.threads) == (['127.0.0.1:9000'], 3, 4)
+    assert cfg.worker_class_str == 'gthread'
+    assert cfg.preload_app
+    assert (cfg.max_requests, cfg.max_requests_jitter) == (500, 50)
+    assert cfg.accesslog == '-'
+    assert server.load().config['WEB_CONCURRENCY'] == 3
+
+def test_single_threaded_workers_are_sync(servers):
+    serve('--workers', '1')
+    assert servers[0].cfg.worker_class_str == 'sync'
+    assert servers[0].cfg.accesslog is None
+
+def test_memory_cache_is_only_kept_for_one_worker(servers):
+    serve('--workers', '1')
+    assert response_cache.stats()['backend'] == 'memory'
+    serve('--workers', '2')
+    app = servers[1].load()
+    assert app.config['RESPONSE_CACHE_BACKEND'] == 'none'
+    assert response_cache.backend is None
+
+def test_workers_drop_connections_inherited_from_the_master(servers):
+    serve('--workers', '2')
+    server = servers[0]
+    app = server.load()
+    with app.app_context():
+        pool = db.engine.pool
+        server.cfg.post_fork(None, None)
+        assert db.engine.pool is not pool
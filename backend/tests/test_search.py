@@ -0,0 +1,63 @@
+import pytest
+import search
+from conftest import create_expense
+from models import db
+
+def found(client, headers, q):
+    response = client.get('/api/expenses', query_string={'q': q}, headers=headers)
+    assert response.status_code == 200
+    return sorted(expense['description'] for expense in response.get_json()['expenses'])
+
+@pytest.fixture
+def without_index(app, monkeypatch):
+    """Search through the LIKE fallback, as on databases without FTS5."""
+    with app.app_context():
+        url = str(db.engine.url)
+    monkeypatch.setattr(search, '_index_available', {url: False})
+
+def test_index_follows_inserts_updates_and_deletes(client, headers):
+    expense = create_expense(client, headers, description='Coffee beans')
+    assert found(client, headers, 'coff') == ['Coffee beans']
+
+    client.put(f"/api/expenses/{expense['id']}", json={'description': 'Green tea'}, headers=headers)
+    assert found(client, headers, 'coffee') == []
+    assert found(client, headers, 'tea') == ['Green tea']
+
+    client.delete(f"/api/expenses/{expense['id']}", headers=headers)
+    assert found(client, headers, 'tea') == []
+
+def test_index_follows_bulk_inserts(client, headers):
+    items = [{'amount': 3, 'description': d, 'category': 'Food', 'date': '2024-03-01'} for d in ('Bagel', 'Bread')]
+    client.post('/api/expenses/bulk', json={'expenses': items}, headers=headers)
+    assert found(client, headers, 'b') == ['Bagel', 'Bread']
+    assert found(client, headers, 'bag') == ['Bagel']
+
+@pytest.mark.parametrize('q, expected', [
+    ('"coffee', ['Coffee beans', 'coffee or tea']),
+    ('coffee*', ['Coffee beans', 'coffee or tea']),
+    ('coffee OR tea', ['coffee or tea']),
+    ('NEAR', ['NEAR office']),
+    ('NEAR(coffee tea)', []),
+    ('special"', ['Tea "special" blend']),
+    ('-tea', ['Tea "special" blend', 'coffee or tea']),
+    ('tea AND', []),
+])
+def test_operators_in_queries_are_plain_words(client, headers, q, expected):
+    for description in ('Coffee beans', 'coffee or tea', 'NEAR office', 'Tea "special" blend'):
+        create_expense(client, headers, description=description)
+    assert found(client, headers, q) == expected
+
+def test_queries_without_words_do_not_filter(client, headers):
+    create_expense(client, headers, description='Coffee beans')
+    assert found(client, headers, '"*') == ['Coffee beans']
+
+def test_like_fallback_matches_words_anywhere(client, headers, without_index):
+    for description in ('Coffee beans', 'coffee or tea', 'Decaf coffee'):
+        create_expense(client, headers, description=description)
+    assert found(client, headers, 'coffee tea') == ['coffee or tea']
+    assert found(client, headers, 'OFF') == ['Coffee beans', 'Decaf coffee', 'coffee or tea']
+
+def test_like_fallback_escapes_wildcards(client, headers, without_index):
+    for description in ('a_b snack', 'ab snack'):
+        create_expense(client, headers, description=description)
+    assert found(client, headers, '_') == ['a_b snack']
@@ -0,0 +1,37 @@
+import pytest
+import serializers
+from conftest import create_expense
+
+@pytest.fixture
+def expenses(client, headers):
+    return [
+        create_expense(client, headers, description='Lunch', amount=12.5, date='2024-03-01'),
+        create_expense(client, headers, description='Taxi', amount=30, category='Transportation', date='2024-03-02'),
+    ]
+
+def test_listed_expenses_match_to_dict(client, headers, expenses):
+    listed = client.get('/api/expenses', headers=headers).get_json()['expenses']
+    single = [client.get(f"/api/expenses/{expense['id']}", headers=headers).get_json()['expense']
+              for expense in reversed(expenses)]
+    assert listed == single
+
+def test_sparse_fieldsets_keep_their_order(client, headers, expenses):
+    listed = client.get('/api/expenses?fields=amount,id,amount', headers=headers).get_json()['expenses']
+    assert [list(expense) for expense in listed] == [['amount', 'id']] * 2
+    assert listed[0] == {'amount': 30.0, 'id': expenses[1]['id']}
+
+def test_sparse_fieldsets_still_page_by_cursor(client, headers, expenses):
+    first = client.get('/api/expenses?fields=description&cursor=&limit=1', headers=headers).get_json()
+    second = client.get(f"/api/expenses?fields=description&limit=1&cursor={first['next_cursor']}", headers=headers).get_json()
+    assert [page['expenses'] for page in (first, second)] == [[{'description': 'Taxi'}], [{'description': 'Lunch'}]]
+
+@pytest.mark.parametrize('fields', ['password', 'id,secret', ','])
+def test_unknown_fields_are_rejected(client, headers, fields):
+    assert client.get('/api/expenses', query_string={'fields': fields}, headers=headers).status_code == 400
+
+def test_standard_library_encoder_gives_the_same_json(client, headers, expenses, monkeypatch):
+    with_orjson = client.get('/api/expenses', headers=headers).get_json()
+    monkeypatch.setattr(serializers, 'orjson', None)
+    create_expense(client, headers, date='2020-01-01')  # moves the data version on, bypassing the cache
+    without_orjson = client.get('/api/expenses', headers=headers).get_json()
+    assert without_orjson['expenses'][:2] == with_orjson['expenses']
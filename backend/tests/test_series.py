@@ -0,0 +1,59 @@
+import pytest
+import routes.expenses
+from conftest import create_expense
+
+@pytest.fixture
+def expenses(client, headers):
+    create_expense(client, headers, category='Food', date='2024-01-15', amount=10)
+    create_expense(client, headers, category='Food', date='2024-03-06', amount=5)
+    create_expense(client, headers, category='Transportation', date='2024-03-07', amount=2.25)
+
+def series(client, headers, **args):
+    response = client.get('/api/expenses/series', query_string=args, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def test_months_without_expenses_are_zero_filled(client, headers, expenses):
+    body = series(client, headers)
+    assert body['buckets'] == ['2024-01-01', '2024-02-01', '2024-03-01']
+    assert body['series'] == [
+        {'category': 'Food', 'totals': [10.0, 0.0, 5.0], 'counts': [1, 0, 1]},
+        {'category': 'Transportation', 'totals': [0.0, 0.0, 2.25], 'counts': [0, 0, 1]},
+    ]
+
+def test_weeks_start_on_monday_and_cover_the_range(client, headers, expenses):
+    body = series(client, headers, bucket='week', date_from='2024-03-01', date_to='2024-03-20')
+    assert body['buckets'] == ['2024-02-26', '2024-03-04', '2024-03-11', '2024-03-18']
+    assert body['series'][0] == {'category': 'Food', 'totals': [0.0, 5.0, 0.0, 0.0], 'counts': [0, 1, 0, 0]}
+
+def test_a_range_without_expenses_still_lists_its_buckets(client, headers, expenses):
+    body = series(client, headers, bucket='day', date_from='2024-02-01', date_to='2024-02-03', category='Food')
+    assert body['buckets'] == ['2024-02-01', '2024-02-02', '2024-02-03']
+    assert body['series'] == [{'category': 'Food', 'totals': [0.0, 0.0, 0.0], 'counts': [0, 0, 0]}]
+
+def test_no_expenses_and_no_range_give_an_empty_series(client, headers):
+    assert series(client, headers) == {'bucket': 'month', 'buckets': [], 'series': []}
+
+def test_rollups_and_the_grouped_query_agree(client, headers, expenses):
+    # Month-aligned ranges are answered from the rollups, others from the expenses
+    aligned = series(client, headers, date_from='2024-01-01', date_to='2024-03-31')
+    unaligned = series(client, headers, date_from='2024-01-02', date_to='2024-03-30')
+    assert aligned == unaligned
+
+@pytest.mark.parametrize('bucket', ['day', 'week', 'month'])
+def test_buckets_are_folded_without_a_date_function(client, headers, expenses, monkeypatch, bucket):
+    args = {'bucket': bucket, 'date_from': '2024-01-02', 'date_to': '2024-03-30'}
+    expected = series(client, headers, **args)
+    monkeypatch.setattr(routes.expenses, 'bucket_column', lambda bucket, dialect_name: None)
+    # A write outside the range moves the data version on, so the cached response is not reused
+    client.post('/api/expenses', json={'amount': 1, 'description': 'x', 'category': 'Other', 'date': '2020-01-01'}, headers=headers)
+    assert series(client, headers, **args) == expected
+
+@pytest.mark.parametrize('args', [
+    {'bucket': 'year'},
+    {'date_from': 'yesterday'},
+    {'bucket': 'day', 'date_from': '2000-01-01', 'date_to': '2024-01-01'},
+])
+def test_bad_arguments_are_rejected(client, headers, args):
+    response = client.get('/api/expenses/series', query_string=args, headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,112 @@
+import threading
+from datetime import date
+import pytest
+from app import create_app
+from config import TestingConfig
+from conftest import register
+from models import db, Expense
+from read_routing import RoutingSession
+from write_coalescing import write_coalescer
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(TestingConfig, 'WRITE_COALESCING_ENABLED', True)
+    monkeypatch.setattr(TestingConfig, 'WRITE_COALESCING_MAX_WAIT', 0.2)
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+def add_expense(description, fail=False):
+    def operation(session):
+        expense = Expense(user_id=1, amount=1, description=description, category='Food', date=date(2024, 3, 1))
+        session.add(expense)
+        session.flush()
+        if fail:
+            raise ValueError(description)
+        return expense.id
+    return operation
+
+def run_together(operations):
+    """Execute the operations from one thread each, all at once; returns results or exceptions in order."""
+    outcomes = [None] * len(operations)
+    barrier = threading.Barrier(len(operations))
+
+    def call(index, operation):
+        barrier.wait()
+        try:
+            outcomes[index] = write_coalescer.execute(operation)
+        except Exception as e:
+            outcomes[index] = e
+
+    threads = [threading.Thread(target=call, args=item) for item in enumerate(operations)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+def descriptions(app):
+    with app.app_context():
+        return sorted(description for (description,) in db.session.query(Expense.description))
+
+def test_concurrent_creates_are_committed_in_batches(client):
+    headers = register(client)
+    before = write_coalescer.stats()
+    statuses = []
+
+    def create(n):
+        response = client.post('/api/expenses', headers=headers, json={
+            'amount': 5, 'description': f'Item {n}', 'category': 'Food', 'date': '2024-03-01'
+        })
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=create, args=(n,)) for n in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = write_coalescer.stats()
+    assert statuses == [201] * 20
+    assert stats['operations'] - before['operations'] == 20
+    assert stats['batches'] - before['batches'] < 20
+    assert client.get('/api/expenses', headers=headers).get_json()['total'] == 20
+
+def test_a_failing_operation_only_fails_its_caller(app, client):
+    register(client)
+    before = write_coalescer.stats()
+
+    outcomes = run_together([add_expense('a'), add_expense('bad', fail=True), add_expense('b'), add_expense('c')])
+
+    assert isinstance(outcomes[1], ValueError)
+    assert all(isinstance(outcome, int) for index, outcome in enumerate(outcomes) if index != 1)
+    assert descriptions(app) == ['a', 'b', 'c']
+    stats = write_coalescer.stats()
+    assert stats['batches'] - before['batches'] == 1
+    assert stats['failed_operations'] - before['failed_operations'] == 1
+    assert stats['fallbacks'] == before['fallbacks']
+
+def test_a_failed_group_commit_falls_back_to_one_commit_each(app, client, monkeypatch):
+    register(client)
+    before = write_coalescer.stats()
+    commit = RoutingSession.commit
+    failures = []
+
+    def commit_failing_once(session):
+        if threading.current_thread().name == 'write-coalescer' and not failures:
+            failures.append(1)
+            raise RuntimeError('disk I/O error')
+        return commit(session)
+
+    monkeypatch.setattr(RoutingSession, 'commit', commit_failing_once)
+    outcomes = run_together([add_expense('a'), add_expense('bad', fail=True), add_expense('b')])
+
+    assert isinstance(outcomes[0], int) and isinstance(outcomes[2], int)
+    assert isinstance(outcomes[1], ValueError)
+    assert descriptions(app) == ['a', 'b']
+    assert write_coalescer.stats()['fallbacks'] == before['fallbacks'] + 1
@@ -0,0 +1,83 @@
+import math
+from datetime import datetime
+
+def validate_amount(amount):
+    """Validate an expense amount. Returns a (value, error_message) tuple."""
+    try:
+        amount = float(amount)
+    except (ValueError, TypeError):
+        return None, 'Invalid amount format'
+    if not math.isfinite(amount):
+        return None, 'Amount must be a finite number'
+    if amount <= 0:
+        return None, 'Amount must be greater than 0'
+    return amount, None
+
+def validate_description(description):
+    """Validate an expense description. Returns a (value, error_message) tuple."""
+    if not isinstance(description, str):
+        return None, 'Description must be a string'
+    description = description.strip()
+    if len(description) > 255:
+        return None, 'Description must be less than 255 characters'
+    return description, None
+
+def validate_category(category, categories):
+    """Validate an expense category. Returns a (value, error_message) tuple."""
+    if isinstance(category, str):
+        category = category.strip()
+    if category not in categories:
+        return None, f'Invalid category. Must be one of: {", ".join(categories)}'
+    return category, None
+
+def validate_expense_date(expense_date):
+    """Validate a YYYY-MM-DD expense date. Returns a (date, error_message) tuple."""
+    try:
+        return datetime.strptime(expense_date, '%Y-%m-%d').date(), None
+    except (ValueError, TypeError):
+        return None, 'Invalid date format. Use YYYY-MM-DD'
+
+def validate_expense_data(data, categories):
+    """Validate the fields of a new expense.
+
+    Returns a (values, error_message) tuple where values holds the cleaned
+    amount, description, category and date ready to be stored.
+    """
+    if not isinstance(data, dict):
+        return None, 'Expense must be an object'
+
+    amount = data.get('amount')
+    description = data.get('description', '')
+    category = data.get('category', '')
+    expense_date = data.get('date')
+
+    if isinstance(description, str):
+        description = description.strip()
+    if isinstance(category, str):
+        category = category.strip()
+
+    if not all([amount, description, category, expense_date]):
+        return None, 'Amount, description, category, and date are required'
+
+    amount, error = validate_amount(amount)
+    if error:
+        return None, error
+
+    category, error = validate_category(category, categories)
+    if error:
+        return None, error
+
+    expense_date, error = validate_expense_date(expense_date)
+    if error:
+        return None, error
+
+    description, error = validate_description(description)
+    if error:
+        return None, error
+
+    return {
+        'amount': amount,
+        'description': description,
+        'category': category,
+        'date': expense_date
+    }, None
@@ -0,0 +1,150 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from background import ProcessThread
+from models import db
+
+logger = logging.getLogger(__name__)
+
+class WriteCoalescer:
+    """Group commit for small write operations from concurrent requests.
+
+    An operation is a callable taking a session; it makes its changes,
+    flushes and returns a plain result. When ``WRITE_COALESCING_ENABLED``
+    is off, operations run in the caller's session and commit on their own.
+    When it is on, a writer thread per process gathers up to
+    ``WRITE_COALESCING_MAX_BATCH`` operations, waiting at most
+    ``WRITE_COALESCING_MAX_WAIT`` seconds after the first one, and runs each
+    inside its own savepoint so a failing operation only rolls back itself.
+    The batch then commits once, and every caller gets its own result or
+    exception. If the commit fails, the batch is retried one operation per
+    transaction.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.queue = queue.SimpleQueue()
+        self.writer = ProcessThread(self._write_forever, 'write-coalescer', setup=self._reset_queue)
+        self.lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self.counters = {'batches': 0, 'operations': 0, 'failed_operations': 0, 'fallbacks': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config['WRITE_COALESCING_ENABLED']
+        self.max_batch = app.config['WRITE_COALESCING_MAX_BATCH']
+        self.max_wait = app.config['WRITE_COALESCING_MAX_WAIT']
+        app.extensions['write_coalescer'] = self
+
+    def execute(self, operation):
+        """Run ``operation(session)`` in a committed write transaction and return its result."""
+        if not self.enabled:
+            result = operation(db.session)
+            db.session.commit()
+            return result
+
+        self.writer.ensure_started()
+        future = Future()
+        self.queue.put((operation, future))
+        return future.result()
+
+    def _reset_queue(self):
+        # Operations queued in a parent process are not this process's to run
+        self.queue = queue.SimpleQueue()
+
+    def _write_forever(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                with self.app.app_context():
+                    self._commit_batch(batch)
+            except Exception as e:
+                logger.exception('write batch failed')
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit_batch(self, batch):
+        session = db.session
+        outcomes = []
+        try:
+            if session.get_bind().dialect.name == 'sqlite':
+                # The sqlite3 module does not emit BEGIN before a SAVEPOINT,
+                # so releasing the first one would commit it on its own; open
+                # the transaction explicitly, taking the write lock up front
+                session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+            for operation, future in batch:
+                try:
+                    with session.begin_nested():
+                        outcomes.append((future, operation(session), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+            session.commit()
+        except Exception:
+            session.rollback()
+            logger.warning('group commit failed, retrying operations one by one', exc_info=True)
+            self._count(fallbacks=1)
+            self._commit_individually(batch)
+            return
+
+        failed = 0
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                failed += 1
+                future.set_exception(error)
+        self._record_batch(len(batch), failed)
+
+    def _commit_individually(self, batch):
+        failed = 0
+        for operation, future in batch:
+            try:
+                result = operation(db.session)
+                db.session.commit()
+                future.set_result(result)
+            except Exception as e:
+                db.session.rollback()
+                failed += 1
+                future.set_exception(e)
+        self._record_batch(len(batch), failed)
+
+    def _record_batch(self, size, failed):
+        with self.lock:
+            self.batch_sizes[size] += 1
+            self.counters['batches'] += 1
+            self.counters['operations'] += size
+            self.counters['failed_operations'] += failed
+
+    def _count(self, **amounts):
+        with self.lock:
+            for name, amount in amounts.items():
+                self.counters[name] += amount
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['batch_sizes'] = dict(sorted(self.batch_sizes.items()))
+        stats['enabled'] = self.enabled
+        stats['mean_batch_size'] = round(stats['operations'] / stats['batches'], 2) if stats['batches'] else None
+        stats['max_batch_size'] = max(stats['batch_sizes'], default=None)
+        return stats
+
+write_coalescer = WriteCoalescer()